@@ -0,0 +1,52 @@
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+from benchmarks.fake_servers import FakeData, start_fake_jira
+from robojira_cli.helpers.dateutils import last_day_of_month
+from robojira_cli.helpers.worklog_store import WorklogStore
+from robojira_cli.jira_client import JiraApi
+
+YEAR, MONTH = 2024, 1
+
+
+def get_total(jira_api: JiraApi, account_id: str) -> int:
+    start_date = datetime(YEAR, MONTH, 1)
+    end_date = last_day_of_month(MONTH, YEAR)
+    report = jira_api.get_team_report(start_date, end_date, [account_id])
+    return sum(seconds for _, _, seconds in report[account_id].totals())
+
+
+def main():
+    # Regression check: a worklog edited by an untracked author has to
+    # leave the store, as it leaves the live Jira result
+    data = FakeData(users=4, issues=40, worklogs_per_issue=10)
+    server = start_fake_jira(data)
+    base_url = f"http://127.0.0.1:{server.server_port}/rest/api/3"
+    with tempfile.TemporaryDirectory() as folder:
+        store = WorklogStore(Path(folder).joinpath("store.db"))
+        stored = JiraApi(
+            "bench", "user0", "token", store=store, base_url=base_url
+        )
+        live = JiraApi("bench", "user0", "token", base_url=base_url)
+
+        get_total(stored, "acc-1")
+        worklog = next(
+            worklog
+            for worklog in data.worklogs.values()
+            if worklog["updateAuthor"]["accountId"] == "acc-1"
+        )
+        worklog["updateAuthor"] = {"accountId": "acc-untracked"}
+        worklog["updated"] = data.touch()
+
+        expected = get_total(live, "acc-1")
+        actual = get_total(stored, "acc-1")
+    server.shutdown()
+    print(f"store: {actual}s, Jira: {expected}s")
+    if actual != expected:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+EMBEDDED_WORKLOGS = 20
+
+
+class FakeData:
+    def __init__(
+        self,
+        users: int = 5,
+        issues: int = 50,
+        worklogs_per_issue: int = 10,
+        year: int = 2024,
+        month: int = 1,
+        seed: int = 1,
+    ):
+        rnd = random.Random(seed)
+        self.users = [
+            {
+                "accountId": f"acc-{index}",
+                "emailAddress": f"user{index}@example.com",
+                "displayName": f"User {index}",
+            }
+            for index in range(users)
+        ]
+        self.issues = []
+        self.worklogs = {}
+        self.deleted: List[Tuple[str, int]] = []
+        worklog_id = 1
+        created = int(time.time() * 1000) - 3_600_000
+        for index in range(issues):
+            issue = {
+                "id": str(10000 + index),
+                "key": f"PRJ-{index + 1}",
+                "summary": f"Issue number {index + 1}",
+                "worklogs": [],
+            }
+            for _ in range(worklogs_per_issue):
+                author = rnd.choice(self.users)
+                started = datetime(year, month, rnd.randint(1, 28), 10)
+                worklog = {
+                    "id": str(worklog_id),
+                    "issueId": issue["id"],
+                    "author": {"accountId": author["accountId"]},
+                    "updateAuthor": {"accountId": author["accountId"]},
+                    "started": started.strftime(
+                        "%Y-%m-%dT%H:%M:%S.000+0000"
+                    ),
+                    "timeSpentSeconds": rnd.choice([1800, 3600, 7200]),
+                    "updated": created,
+                }
+                issue["worklogs"].append(worklog)
+                self.worklogs[worklog["id"]] = worklog
+                worklog_id += 1
+            self.issues.append(issue)
+        self.clock = created
+
+    def touch(self) -> int:
+        self.clock = max(self.clock + 1, int(time.time() * 1000))
+        return self.clock
+
+
+class FakeJiraHandler(BaseHTTPRequestHandler):
+    data: FakeData
+    stats: Counter
+    latency: float = 0.0
+    throttle_rate: float = 0.0
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, payload, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self, method: str):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        path = url.path.replace("/rest/api/3", "")
+        if path == "/__stats":
+            with self.lock:
+                payload = dict(self.stats)
+                if "reset" in query:
+                    self.stats.clear()
+            return self._send(payload)
+        endpoint = re.sub(r"/issue/[^/]+/", "/issue/{key}/", path)
+        with self.lock:
+            self.stats[f"{method} {endpoint}"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            with self.lock:
+                self.stats["throttled"] += 1
+            self.send_response(429)
+            self.send_header("Retry-After", "0")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = {}
+        if method == "POST":
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+        if path == "/myself":
+            return self._send(self.data.users[0])
+        if path == "/user/search":
+            return self._send(
+                [
+                    user
+                    for user in self.data.users
+                    if query.get("query") == user["emailAddress"]
+                ]
+            )
+        if path == "/search/jql":
+            if method == "POST":
+                query = {k: str(v) for k, v in body.items()}
+            return self._send(self.search(query))
+        match = re.match(r"/issue/([^/]+)/worklog", path)
+        if match:
+            return self._send(self.issue_worklogs(match.group(1), query))
+        if path == "/worklog/updated":
+            return self._send(self.updated(query))
+        if path == "/worklog/deleted":
+            since = int(query.get("since", 0))
+            values = [
+                {"worklogId": int(wid), "updatedTime": ts}
+                for wid, ts in self.data.deleted
+                if ts > since
+            ]
+            return self._send(
+                {
+                    "values": values,
+                    "since": since,
+                    "until": self.data.touch(),
+                    "lastPage": True,
+                }
+            )
+        if path == "/worklog/list":
+            ids = {str(wid) for wid in body.get("ids", [])}
+            worklogs = self.data.worklogs
+            return self._send([worklogs[wid] for wid in ids if wid in worklogs])
+        self._send({"errorMessages": ["not found"]}, 404)
+
+    def do_GET(self):
+        self._route("GET")
+
+    def do_POST(self):
+        self._route("POST")
+
+    def search(self, query: Dict[str, str]) -> dict:
+        jql = query.get("jql", "")
+        conditions = re.findall(
+            r'worklogDate\s*(>=|<=|=)\s*"?([\d-]+)"?', jql
+        )
+        authors = None
+        match = re.search(r"worklogAuthor\s*=\s*\"?([\w:-]+)\"?", jql)
+        if match:
+            authors = {match.group(1)}
+        match = re.search(r"worklogAuthor\s+in\s*\(([^)]*)\)", jql)
+        if match:
+            authors = {
+                a.strip().strip('"') for a in match.group(1).split(",")
+            }
+        keys = None
+        match = re.search(r"(key|id)\s+in\s*\(([^)]*)\)", jql)
+        if match:
+            keys = {a.strip().strip('"') for a in match.group(2).split(",")}
+        fields = query.get("fields", "").split(",")
+
+        def date_ok(day: str) -> bool:
+            for op, value in conditions:
+                if op == "=" and day != value:
+                    return False
+                if op == ">=" and day < value:
+                    return False
+                if op == "<=" and day > value:
+                    return False
+            return True
+
+        result = []
+        for issue in self.data.issues:
+            if keys is not None and not (
+                issue["key"] in keys or issue["id"] in keys
+            ):
+                continue
+            worklogs = issue["worklogs"]
+            if conditions and not any(
+                date_ok(w["started"][:10]) for w in worklogs
+            ):
+                continue
+            if authors is not None and not any(
+                w["author"]["accountId"] in authors for w in worklogs
+            ):
+                continue
+            issue_fields = {}
+            if "summary" in fields:
+                issue_fields["summary"] = issue["summary"]
+            if "updated" in fields:
+                issue_fields["updated"] = str(
+                    max([w["updated"] for w in worklogs] or [0])
+                )
+            if "worklog" in fields:
+                issue_fields["worklog"] = {
+                    "startAt": 0,
+                    "maxResults": EMBEDDED_WORKLOGS,
+                    "total": len(worklogs),
+                    "worklogs": worklogs[:EMBEDDED_WORKLOGS],
+                }
+            result.append(
+                {"id": issue["id"], "key": issue["key"], "fields": issue_fields}
+            )
+        start = int(query.get("nextPageToken", 0))
+        size = int(query.get("maxResults", 50))
+        page = {"issues": result[start:start + size]}
+        if start + size < len(result):
+            page["nextPageToken"] = str(start + size)
+        return page
+
+    def issue_worklogs(self, key: str, query: Dict[str, str]) -> dict:
+        issue = next(
+            (i for i in self.data.issues if key in (i["key"], i["id"])), None
+        )
+        worklogs = issue["worklogs"] if issue else []
+        after = int(query.get("startedAfter", 0))
+        before = int(query.get("startedBefore", 2**62))
+
+        def started_ms(worklog) -> int:
+            value = datetime.strptime(
+                worklog["started"][:19], "%Y-%m-%dT%H:%M:%S"
+            )
+            return int(value.timestamp() * 1000)
+
+        worklogs = [w for w in worklogs if after <= started_ms(w) <= before]
+        start = int(query.get("startAt", 0))
+        size = min(int(query.get("maxResults", 5000)), 5000)
+        return {
+            "startAt": start,
+            "maxResults": size,
+            "total": len(worklogs),
+            "worklogs": worklogs[start:start + size],
+        }
+
+    def updated(self, query: Dict[str, str]) -> dict:
+        since = int(query.get("since", 0))
+        changed = sorted(
+            (w for w in self.data.worklogs.values() if w["updated"] > since),
+            key=lambda w: w["updated"],
+        )
+        page = changed[:1000]
+        until = page[-1]["updated"] if page else self.data.touch()
+        return {
+            "values": [
+                {"worklogId": int(w["id"]), "updatedTime": w["updated"]}
+                for w in page
+            ],
+            "since": since,
+            "until": until,
+            "lastPage": len(changed) <= 1000,
+        }
+
+
+class FakeWorkingDaysHandler(FakeJiraHandler):
+    def _route(self, method: str):
+        url = urlparse(self.path)
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if url.path == "/__stats":
+            with self.lock:
+                payload = dict(self.stats)
+                if "reset" in query:
+                    self.stats.clear()
+            return self._send(payload)
+        with self.lock:
+            self.stats[f"{method} {url.path}"] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        if not url.path.endswith("/list_non_working_days"):
+            return self._send({"error": "not found"}, 404)
+        day = date.fromisoformat(query["start_date"])
+        end = date.fromisoformat(query["end_date"])
+        days = []
+        while day <= end:
+            if day.weekday() >= 5 or (day.month, day.day) == (1, 1):
+                days.append({"date": day.isoformat()})
+            day += timedelta(days=1)
+        self._send({"non_working_days": days})
+
+
+def start_server(
+    handler_class: type, attributes: dict, port: int = 0
+) -> ThreadingHTTPServer:
+    handler = type("Handler", (handler_class,), attributes)
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_fake_jira(
+    data: FakeData,
+    latency: float = 0.0,
+    throttle_rate: float = 0.0,
+    port: int = 0,
+) -> ThreadingHTTPServer:
+    return start_server(
+        FakeJiraHandler,
+        {
+            "data": data,
+            "stats": Counter(),
+            "latency": latency,
+            "throttle_rate": throttle_rate,
+        },
+        port,
+    )
+
+
+def start_fake_working_days(
+    latency: float = 0.0, port: int = 0
+) -> ThreadingHTTPServer:
+    return start_server(
+        FakeWorkingDaysHandler,
+        {"stats": Counter(), "latency": latency},
+        port,
+    )
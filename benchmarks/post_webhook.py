@@ -0,0 +1,75 @@
+import argparse
+import hashlib
+import hmac
+import json
+import time
+from datetime import datetime
+from urllib.request import Request, urlopen
+
+
+def build_event(
+    event: str,
+    worklog_id: str,
+    issue_id: str,
+    account_id: str,
+    started: str,
+    seconds: int,
+) -> dict:
+    now = int(time.time() * 1000)
+    return {
+        "timestamp": now,
+        "webhookEvent": f"worklog_{event}",
+        "worklog": {
+            "id": worklog_id,
+            "issueId": issue_id,
+            "author": {"accountId": account_id},
+            "updateAuthor": {"accountId": account_id},
+            "started": f"{started}T10:00:00.000+0000",
+            "timeSpentSeconds": seconds,
+            "updated": now,
+        },
+    }
+
+
+def post_event(url: str, event: dict, secret: str = "") -> dict:
+    body = json.dumps(event).encode()
+    headers = {"Content-Type": "application/json"}
+    if secret:
+        signature = hmac.new(secret.encode(), body, hashlib.sha256)
+        headers["X-Hub-Signature"] = f"sha256={signature.hexdigest()}"
+    request = Request(url, data=body, headers=headers, method="POST")
+    with urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Post a Jira worklog webhook to `robojira serve`"
+    )
+    parser.add_argument(
+        "event", choices=["created", "updated", "deleted"], type=str
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8765/webhook")
+    parser.add_argument("--worklog-id", default="900001")
+    parser.add_argument("--issue-id", default="10000")
+    parser.add_argument("--account-id", default="acc-0")
+    parser.add_argument(
+        "--started", default=datetime.today().strftime("%Y-%m-%d")
+    )
+    parser.add_argument("--seconds", type=int, default=3600)
+    parser.add_argument("--secret", default="")
+    args = parser.parse_args()
+
+    event = build_event(
+        args.event,
+        args.worklog_id,
+        args.issue_id,
+        args.account_id,
+        args.started,
+        args.seconds,
+    )
+    print(post_event(args.url, event, args.secret))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+import argparse
+import contextlib
+import io
+import json
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from urllib.request import urlopen
+
+from benchmarks.fake_servers import (
+    FakeData,
+    start_fake_jira,
+    start_fake_working_days,
+)
+
+YEAR, MONTH = 2024, 1
+SCENARIOS = ["self", "today", "manager", "excel"]
+
+parser = argparse.ArgumentParser(
+    description="Benchmark robojira against local fake Jira and holiday APIs"
+)
+parser.add_argument("--users", type=int, default=10)
+parser.add_argument("--issues", type=int, default=200)
+parser.add_argument("--worklogs-per-issue", type=int, default=10)
+parser.add_argument(
+    "--latency", type=float, default=0.05, help="Seconds per request"
+)
+parser.add_argument(
+    "--throttle", type=float, default=0.0, help="Share of 429 responses"
+)
+parser.add_argument(
+    "--rate-limit", type=float, default=None, help="Client requests/second"
+)
+parser.add_argument("--concurrency", type=int, default=8)
+parser.add_argument(
+    "--scenarios", default=",".join(SCENARIOS), help="Comma separated"
+)
+parser.add_argument(
+    "--store", action="store_true", help="Use the local worklog store"
+)
+parser.add_argument(
+    "--repeat", type=int, default=1, help="Runs per scenario"
+)
+parser.add_argument("--json", action="store_true", help="Print raw JSON")
+parser.add_argument("--child", help=argparse.SUPPRESS)
+
+
+def run_scenario(args) -> dict:
+    from robojira_cli.excel_export import ExcelExporter
+    from robojira_cli.helpers.classes import UserReport
+    from robojira_cli.helpers.dateutils import last_day_of_month
+    from robojira_cli.helpers.report_analyzer import analyze_reports
+    from robojira_cli.helpers.working_days import WorkingDaysApi
+    from robojira_cli.helpers.worklog_store import WorklogStore
+    from robojira_cli.jira_client import JiraApi
+
+    options = json.loads(args.child)
+    store = None
+    if options["store"]:
+        store = WorklogStore(Path(options["folder"]).joinpath("store.db"))
+    jira_api = JiraApi(
+        "bench",
+        "user0@example.com",
+        "token",
+        options["concurrency"],
+        store,
+        rate_limit=options["rate_limit"],
+        base_url=options["jira_url"],
+    )
+    working_day_api = WorkingDaysApi(
+        "token", base_url=options["working_days_url"]
+    )
+    start_date = datetime(YEAR, MONTH, 1)
+    end_date = last_day_of_month(MONTH, YEAR)
+    usernames = [
+        f"user{index}@example.com" for index in range(options["users"])
+    ]
+
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        scenario = options["scenario"]
+        if scenario == "today":
+            jira_api.get_report(datetime(YEAR, MONTH, 15))
+        elif scenario == "self":
+            not_working_days = working_day_api.get_not_working_dates(
+                start_date, end_date, "UA"
+            )
+            reports = jira_api.get_month_report(
+                MONTH, YEAR, print_report=True
+            )
+            analyze_reports(
+                reports, not_working_days, start_date, end_date, "user0"
+            )
+        else:
+            not_working_days = working_day_api.get_not_working_dates(
+                start_date, end_date, "UA"
+            )
+            account_ids = jira_api.get_account_ids(usernames)
+            team_reports = jira_api.get_team_report(
+                start_date, end_date, list(account_ids.values())
+            )
+            user_reports = [
+                UserReport(
+                    user,
+                    team_reports[account_id],
+                    not_working_days,
+                    start_date,
+                    end_date,
+                )
+                for user, account_id in account_ids.items()
+            ]
+            if scenario == "excel":
+                folder = Path(options["folder"])
+                ExcelExporter(user_reports, start_date, end_date, folder)
+    wall = time.perf_counter() - started
+
+    return {
+        "wall_seconds": round(wall, 3),
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1
+        ),
+    }
+
+
+def get_stats(url: str) -> dict:
+    with urlopen(f"{url}/__stats?reset=1") as response:
+        return json.loads(response.read())
+
+
+def main():
+    args = parser.parse_args()
+    if args.child:
+        print(json.dumps(run_scenario(args)))
+        return
+
+    data = FakeData(
+        args.users, args.issues, args.worklogs_per_issue, YEAR, MONTH
+    )
+    jira = start_fake_jira(data, args.latency, args.throttle)
+    working_days = start_fake_working_days(args.latency)
+    jira_url = f"http://127.0.0.1:{jira.server_port}"
+    working_days_url = f"http://127.0.0.1:{working_days.server_port}"
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        for scenario in args.scenarios.split(","):
+            for run in range(1, args.repeat + 1):
+                options = {
+                    "scenario": scenario,
+                    "users": args.users,
+                    "concurrency": args.concurrency,
+                    "rate_limit": args.rate_limit,
+                    "store": args.store,
+                    "folder": folder,
+                    "jira_url": f"{jira_url}/rest/api/3",
+                    "working_days_url": working_days_url,
+                }
+                get_stats(jira_url)
+                get_stats(working_days_url)
+                output = subprocess.run(
+                    [sys.executable, "-m", "benchmarks.run"]
+                    + ["--child", json.dumps(options)],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                result = json.loads(output.strip().splitlines()[-1])
+                requests = get_stats(jira_url)
+                requests.update(get_stats(working_days_url))
+                result.update(
+                    scenario=scenario,
+                    run=run,
+                    requests=sum(
+                        count
+                        for endpoint, count in requests.items()
+                        if endpoint != "throttled"
+                    ),
+                    endpoints=requests,
+                )
+                results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    print(
+        f"{'scenario':<10}{'run':>4}{'requests':>10}{'wall, s':>10}"
+        f"{'peak RSS, MB':>14}"
+    )
+    for result in results:
+        print(
+            f"{result['scenario']:<10}{result['run']:>4}"
+            f"{result['requests']:>10}{result['wall_seconds']:>10}"
+            f"{result['peak_rss_mb']:>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,621 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+from typing import (
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from robojira_cli.helpers.constants import (
+    ACCOUNTS_TTL,
+    AUTHORS_PER_QUERY,
+    DATE_FORMAT,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_JIRA_RATE_LIMIT,
+    REPORT_WINDOW_DAYS,
+    WORKLOG_IDS_PER_REQUEST,
+)
+
+try:
+    from robojira_cli.helpers.classes import (
+        StringTable,
+        UserWorklogs,
+        WorklogReport,
+    )
+    from robojira_cli.helpers.dateutils import get_worklog_date
+    from robojira_cli.helpers.file_cache import FileCache
+    from robojira_cli.helpers.lean_json import loads
+    from robojira_cli.helpers.transport import ThrottledSession
+    from robojira_cli.helpers.worklog_store import WorklogStore
+except ImportError:
+    from helpers.classes import StringTable, UserWorklogs, WorklogReport
+    from helpers.dateutils import get_worklog_date
+    from helpers.file_cache import FileCache
+    from helpers.lean_json import loads
+    from helpers.transport import ThrottledSession
+    from helpers.worklog_store import WorklogStore
+
+T = TypeVar("T")
+
+
+class JiraError(ValueError):
+    def __init__(self, status: int, content: bytes):
+        super().__init__(content)
+        self.status = status
+
+
+def is_user_error(error: BaseException) -> bool:
+    # A 400 is about the query, e.g. one author Jira rejects; anything else
+    # (auth, domain, network, missing cassette) fails every user alike
+    return isinstance(error, JiraError) and error.status == 400
+
+
+def iterate_sync(iterator: AsyncIterator[T]) -> Iterator[T]:
+    loop = asyncio.new_event_loop()
+    try:
+        while True:
+            try:
+                yield loop.run_until_complete(iterator.__anext__())
+            except StopAsyncIteration:
+                break
+    finally:
+        loop.run_until_complete(iterator.aclose())
+        loop.close()
+
+
+class AsyncJiraApi:
+    def __init__(
+        self,
+        domain: str,
+        login: str,
+        token: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        store: Optional[WorklogStore] = None,
+        cache: Optional[FileCache] = None,
+        rate_limit: Optional[float] = DEFAULT_JIRA_RATE_LIMIT,
+        base_url: Optional[str] = None,
+    ):
+        self.base_url = (
+            base_url or f"https://{domain}.atlassian.net/rest/api/3"
+        )
+        self.domain = domain
+        self.login = login
+        self.session = ThrottledSession(rate_limit, concurrency)
+        self.session.auth = (login, token)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.executor = ThreadPoolExecutor(
+            max_workers=concurrency, thread_name_prefix="robojira"
+        )
+        self.concurrency = concurrency
+        self.store = store
+        self.cache = cache
+        self.user_id: Optional[str] = None
+        # Per-report issue caches keyed by issue key and its `updated`
+        # value, so every issue's worklogs are downloaded and parsed once
+        self.worklog_fields: Dict[str, Tuple[str, object]] = {}
+        self.issue_worklogs: Dict[Tuple[str, str, str, str], object] = {}
+
+    def send(self, method: str, url: str, **kwargs):
+        response = self.session.request(method, url, **kwargs)
+        if not response.ok:
+            raise JiraError(response.status_code, response.content)
+        # Decoded on the worker thread, keeping only what worklogs need
+        return loads(response.content)
+
+    async def request(self, method: str, url: str, **kwargs):
+        loop = asyncio.get_running_loop()
+        request = partial(self.send, method, url, **kwargs)
+        return await loop.run_in_executor(self.executor, request)
+
+    async def get(self, url: str, params: Optional[dict] = None):
+        return await self.request("GET", url, params=params)
+
+    async def post(self, url: str, data: dict):
+        return await self.request("POST", url, json=data)
+
+    async def get_myself(self) -> dict:
+        return await self.get(f"{self.base_url}/myself")
+
+    async def get_user_id(self) -> str:
+        if not self.user_id:
+            cached = self.get_cached_account_ids([self.login])
+            if self.login in cached:
+                self.user_id = cached[self.login]
+            else:
+                self.user_id = (await self.get_myself())["accountId"]
+                self.save_account_ids({self.login: self.user_id})
+        return self.user_id
+
+    async def search_issues(
+        self, query: str, fields: str
+    ) -> AsyncIterator[List[dict]]:
+        url = self.base_url + "/search/jql"
+        params = {"jql": query, "maxResults": 100, "fields": fields}
+        while True:
+            data = await self.get(url, params=dict(params))
+            yield data["issues"]
+            if not data.get("nextPageToken"):
+                break
+            params["nextPageToken"] = data["nextPageToken"]
+
+    async def get_user_by_username(self, username: str) -> Optional[dict]:
+        url = f"{self.base_url}/user/search"
+        data = await self.get(url, params={"query": username})
+        if data:
+            return data[0]
+
+    def get_cached_account_ids(self, usernames: List[str]) -> Dict[str, str]:
+        if not self.cache:
+            return {}
+        accounts = self.cache.get(f"accounts_{self.domain}") or {}
+        now = time.time()
+        return {
+            username: accounts[username]["accountId"]
+            for username in usernames
+            if username in accounts
+            and now - accounts[username]["fetched_at"] < ACCOUNTS_TTL
+        }
+
+    def save_account_ids(self, account_ids: Dict[str, str]):
+        if not self.cache or not account_ids:
+            return
+        key = f"accounts_{self.domain}"
+        accounts = self.cache.get(key) or {}
+        now = time.time()
+        for username, account_id in account_ids.items():
+            accounts[username] = {"accountId": account_id, "fetched_at": now}
+        self.cache.set(key, accounts)
+
+    async def get_account_ids(self, usernames: List[str]) -> Dict[str, str]:
+        cached = self.get_cached_account_ids(usernames)
+        missing = [username for username in usernames if username not in cached]
+        users = await asyncio.gather(
+            *[self.get_user_by_username(username) for username in missing],
+            return_exceptions=True,
+        )
+        found = {}
+        for username, user_data in zip(missing, users):
+            if isinstance(user_data, Exception):
+                if not is_user_error(user_data):
+                    raise user_data
+                print(f"Can't look up user {username}: {user_data}")
+                continue
+            if not user_data:
+                print(f"Can't find user with username {username}")
+                continue
+            found[username] = user_data["accountId"]
+        self.save_account_ids(found)
+
+        account_ids = {**cached, **found}
+        return {
+            username: account_ids[username]
+            for username in usernames
+            if username in account_ids
+        }
+
+    async def get_worklog_fields(self, keys: List[str]) -> Dict[str, dict]:
+        pages = await asyncio.gather(
+            *[
+                self.get(
+                    self.base_url + "/search/jql",
+                    params={
+                        "jql": f"key in ({', '.join(keys[i:i + 100])})",
+                        "maxResults": 100,
+                        "fields": "worklog",
+                    },
+                )
+                for i in range(0, len(keys), 100)
+            ]
+        )
+        return {
+            issue["key"]: issue["fields"].get("worklog")
+            for page in pages
+            for issue in page["issues"]
+        }
+
+    def clear_caches(self):
+        # The issue caches only serve one report, so every report starts
+        # empty and a long-running daemon doesn't keep them growing
+        self.worklog_fields.clear()
+        self.issue_worklogs.clear()
+
+    async def load_worklog_fields(self, issues: List[dict]):
+        if self.session.cassette:
+            # Which window claims a key first depends on timing, so with a
+            # cassette every page asks for its own keys and a replay sends
+            # the same queries as the recording
+            keys = sorted(issue["key"] for issue in issues)
+            fields = await self.get_worklog_fields(keys)
+            for issue in issues:
+                issue["fields"]["worklog"] = fields.get(issue["key"])
+            return
+
+        loop = asyncio.get_running_loop()
+        missing: Dict[str, str] = {}
+        values: Dict[str, object] = {}
+        for issue in issues:
+            updated = issue["fields"].get("updated", "")
+            version, value = self.worklog_fields.get(issue["key"], ("", None))
+            # Tasks left over from another event loop can't be awaited
+            stale = isinstance(value, asyncio.Future) and (
+                value.get_loop() is not loop
+            )
+            if not updated or version != updated or stale:
+                missing[issue["key"]] = updated
+            else:
+                values[issue["key"]] = value
+
+        if missing:
+            task = asyncio.ensure_future(self.get_worklog_fields(list(missing)))
+            for key, updated in missing.items():
+                self.worklog_fields[key] = (updated, task)
+            try:
+                fields = await task
+            except BaseException:
+                for key in missing:
+                    if self.worklog_fields.get(key, ("", None))[1] is task:
+                        del self.worklog_fields[key]
+                raise
+            for key, updated in missing.items():
+                values[key] = fields.get(key)
+                if self.worklog_fields.get(key, ("", None))[1] is task:
+                    self.worklog_fields[key] = (updated, values[key])
+
+        for issue in issues:
+            value = values.get(issue["key"])
+            if isinstance(value, asyncio.Future):
+                value = (await value).get(issue["key"])
+            issue["fields"]["worklog"] = value
+
+    async def get_issue_worklogs(
+        self, issue: dict, start_date: datetime, end_date: datetime
+    ) -> List[dict]:
+        worklog = issue["fields"].get("worklog")
+        if worklog and worklog["total"] <= len(worklog["worklogs"]):
+            return worklog["worklogs"]
+
+        updated = issue["fields"].get("updated")
+        if not updated:
+            return await self.fetch_issue_worklogs(
+                issue["key"], start_date, end_date
+            )
+
+        key = (
+            issue["key"],
+            updated,
+            start_date.strftime(DATE_FORMAT),
+            end_date.strftime(DATE_FORMAT),
+        )
+        value = self.issue_worklogs.get(key)
+        if isinstance(value, asyncio.Future):
+            # Concurrent windows of one run wait for the same download
+            if value.get_loop() is asyncio.get_running_loop():
+                return await value
+        elif value is not None:
+            return value
+
+        task = asyncio.ensure_future(
+            self.fetch_issue_worklogs(issue["key"], start_date, end_date)
+        )
+        self.issue_worklogs[key] = task
+        try:
+            worklogs = await task
+        except BaseException:
+            if self.issue_worklogs.get(key) is task:
+                del self.issue_worklogs[key]
+            raise
+        self.issue_worklogs[key] = worklogs
+        return worklogs
+
+    async def fetch_issue_worklogs(
+        self, issue_key: str, start_date: datetime, end_date: datetime
+    ) -> List[dict]:
+        url = f"{self.base_url}/issue/{issue_key}/worklog"
+        start = start_date.replace(hour=0, minute=0, second=0)
+        end = end_date.replace(hour=23, minute=59, second=59)
+        # Widen by a day so worklogs from other timezones are not lost
+        params = {
+            "startedAfter": int((start - timedelta(days=1)).timestamp() * 1000),
+            "startedBefore": int((end + timedelta(days=1)).timestamp() * 1000),
+            "startAt": 0,
+            "maxResults": 5000,
+        }
+        worklogs = []
+        while True:
+            data = await self.get(url, params=dict(params))
+            worklogs.extend(data["worklogs"])
+            params["startAt"] += len(data["worklogs"])
+            if not data["worklogs"] or params["startAt"] >= data["total"]:
+                break
+        return worklogs
+
+    async def iter_worklogs(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+        period: Optional[Tuple[datetime, datetime]] = None,
+    ) -> AsyncIterator[List[Tuple[dict, List[dict]]]]:
+        start = start_date.strftime(DATE_FORMAT)
+        end = end_date.strftime(DATE_FORMAT)
+        authors = ", ".join(f'"{user_id}"' for user_id in user_ids)
+        query = (
+            f"worklogDate >= {start} AND worklogDate <= {end} "
+            f"AND worklogAuthor in ({authors})"
+        )
+        # When several queries of one run can match the same issues, search
+        # without the worklog field and download each issue's worklogs once
+        # for the whole run period
+        if period:
+            fields = "summary,updated"
+        else:
+            fields = "summary,updated,worklog"
+        fetch_start, fetch_end = period or (start_date, end_date)
+        async for issues in self.search_issues(query, fields):
+            if period:
+                await self.load_worklog_fields(issues)
+            issue_worklogs = await asyncio.gather(
+                *[
+                    self.get_issue_worklogs(issue, fetch_start, fetch_end)
+                    for issue in issues
+                ]
+            )
+            yield list(zip(issues, issue_worklogs))
+
+    async def collect_worklogs(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+        spent: Dict[str, UserWorklogs],
+        period: Optional[Tuple[datetime, datetime]] = None,
+    ):
+        start = start_date.strftime(DATE_FORMAT)
+        end = end_date.strftime(DATE_FORMAT)
+        chunk_ids = set(user_ids)
+        pages = self.iter_worklogs(start_date, end_date, user_ids, period)
+        async for page in pages:
+            for issue, worklogs in page:
+                title = f'{issue["key"]}: {issue["fields"]["summary"]}'
+                for worklog in worklogs:
+                    author = worklog["updateAuthor"]["accountId"]
+                    if author not in chunk_ids:
+                        continue
+                    date = get_worklog_date(worklog["started"])
+                    if not start <= date <= end:
+                        continue
+                    spent[author].add(
+                        date, title, worklog["timeSpentSeconds"]
+                    )
+
+    async def get_issues_by_ids(self, issue_ids: List[str]) -> List[dict]:
+        pages = await asyncio.gather(
+            *[
+                self.get(
+                    self.base_url + "/search/jql",
+                    params={
+                        "jql": f"id in ({', '.join(issue_ids[i:i + 100])})",
+                        "maxResults": 100,
+                        "fields": "summary",
+                    },
+                )
+                for i in range(0, len(issue_ids), 100)
+            ]
+        )
+        return [issue for page in pages for issue in page["issues"]]
+
+    async def get_worklogs_by_ids(self, worklog_ids: List[int]) -> List[dict]:
+        size = WORKLOG_IDS_PER_REQUEST
+        pages = await asyncio.gather(
+            *[
+                self.post(
+                    f"{self.base_url}/worklog/list",
+                    {"ids": worklog_ids[i:i + size]},
+                )
+                for i in range(0, len(worklog_ids), size)
+            ]
+        )
+        return [worklog for page in pages for worklog in page]
+
+    async def get_changed_worklog_ids(
+        self, kind: str, since: int
+    ) -> Tuple[List[int], int]:
+        url = f"{self.base_url}/worklog/{kind}"
+        worklog_ids = []
+        while True:
+            data = await self.get(url, params={"since": since})
+            worklog_ids.extend(value["worklogId"] for value in data["values"])
+            since = data["until"]
+            if data.get("lastPage", True):
+                break
+        return worklog_ids, since
+
+    async def sync_store(self):
+        since = self.store.get_meta("updated_since")
+        if since is None:
+            # Fresh store: everything older is fetched by seed_store
+            since = str(int((time.time() - 60) * 1000))
+            self.store.set_meta("updated_since", since)
+            self.store.set_meta("deleted_since", since)
+            return
+
+        worklog_ids, since = await self.get_changed_worklog_ids(
+            "updated", int(since)
+        )
+        tracked = self.store.get_tracked_authors()
+        worklogs, untracked = [], []
+        for worklog in await self.get_worklogs_by_ids(worklog_ids):
+            if worklog["updateAuthor"]["accountId"] in tracked:
+                worklogs.append(worklog)
+            else:
+                untracked.append(worklog["id"])
+        # A worklog taken over by an untracked author no longer counts for
+        # whoever had it before; webhooks apply the same rule
+        self.store.delete_worklogs(untracked)
+        missing = self.store.get_missing_issue_ids(
+            str(worklog["issueId"]) for worklog in worklogs
+        )
+        if missing:
+            self.store.save_issues(await self.get_issues_by_ids(missing))
+        self.store.save_worklogs(worklogs)
+        self.store.set_meta("updated_since", str(since))
+
+        deleted_since = int(self.store.get_meta("deleted_since"))
+        worklog_ids, since = await self.get_changed_worklog_ids(
+            "deleted", deleted_since
+        )
+        self.store.delete_worklogs(worklog_ids)
+        self.store.set_meta("deleted_since", str(since))
+
+    async def refresh_store(self):
+        # While `robojira serve` applies webhooks the store is already current
+        if not self.store.is_webhook_live():
+            await self.sync_store()
+
+    async def seed_authors(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+        period: Optional[Tuple[datetime, datetime]] = None,
+    ):
+        chunk_ids = set(user_ids)
+        pages = self.iter_worklogs(start_date, end_date, user_ids, period)
+        async for page in pages:
+            self.store.save_issues(issue for issue, _ in page)
+            self.store.save_worklogs(
+                worklog
+                for _, worklogs in page
+                for worklog in worklogs
+                if worklog["updateAuthor"]["accountId"] in chunk_ids
+            )
+        self.store.mark_covered(user_ids, start_date, end_date)
+
+    async def seed_store(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+        period: Optional[Tuple[datetime, datetime]] = None,
+    ):
+        ranges: Dict[Tuple[datetime, datetime], List[str]] = {}
+        for user_id in user_ids:
+            missing = self.store.get_missing_days(user_id, start_date, end_date)
+            if missing:
+                ranges.setdefault((missing[0], missing[-1]), []).append(user_id)
+
+        queries = [
+            (start, end, authors[i:i + AUTHORS_PER_QUERY])
+            for (start, end), authors in ranges.items()
+            for i in range(0, len(authors), AUTHORS_PER_QUERY)
+        ]
+        if len(queries) > 1:
+            period = period or (start_date, end_date)
+        await asyncio.gather(
+            *[
+                self.seed_authors(start, end, authors, period)
+                for start, end, authors in queries
+            ]
+        )
+
+    async def start_report(self):
+        # Once per report; fetch_team_report calls that follow reuse the
+        # refreshed store and the report's caches
+        self.clear_caches()
+        if self.store:
+            await self.refresh_store()
+
+    async def get_team_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+    ) -> Dict[str, UserWorklogs]:
+        await self.start_report()
+        return await self.fetch_team_report(start_date, end_date, user_ids)
+
+    async def fetch_team_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+        period: Optional[Tuple[datetime, datetime]] = None,
+    ) -> Dict[str, UserWorklogs]:
+        if self.store:
+            await self.seed_store(start_date, end_date, user_ids, period)
+            return self.store.get_team_report(start_date, end_date, user_ids)
+
+        dates, titles = StringTable(), StringTable()
+        spent: Dict[str, UserWorklogs] = {
+            user_id: UserWorklogs(dates, titles) for user_id in user_ids
+        }
+        if len(user_ids) > AUTHORS_PER_QUERY:
+            period = period or (start_date, end_date)
+        await asyncio.gather(
+            *[
+                self.collect_worklogs(
+                    start_date,
+                    end_date,
+                    user_ids[index:index + AUTHORS_PER_QUERY],
+                    spent,
+                    period,
+                )
+                for index in range(0, len(user_ids), AUTHORS_PER_QUERY)
+            ]
+        )
+
+        return spent
+
+    async def get_period_report(
+        self, start_date: datetime, end_date: datetime, user_id: str
+    ) -> UserWorklogs:
+        reports = await self.get_team_report(start_date, end_date, [user_id])
+        return reports[user_id]
+
+    async def iter_period_report(
+        self, start_date: datetime, end_date: datetime, user_id: str
+    ) -> AsyncIterator[Tuple[str, List[WorklogReport]]]:
+        await self.start_report()
+
+        # Long ranges get wider windows so the number of searches stays
+        # bounded by the worker count
+        total_days = (end_date - start_date).days + 1
+        window_days = max(
+            REPORT_WINDOW_DAYS, -(-total_days // self.concurrency)
+        )
+        windows = []
+        while start_date <= end_date:
+            window_end = min(
+                end_date, start_date + timedelta(days=window_days - 1)
+            )
+            windows.append((start_date, window_end))
+            start_date = window_end + timedelta(days=1)
+
+        period = None
+        if len(windows) > 1:
+            period = (windows[0][0], windows[-1][1])
+        tasks = [
+            asyncio.ensure_future(
+                self.fetch_team_report(start, end, [user_id], period)
+            )
+            for start, end in windows
+        ]
+        try:
+            # Windows run concurrently but days are yielded in date order
+            for (start, end), task in zip(windows, tasks):
+                report = dict((await task)[user_id].items())
+                while start <= end:
+                    date = start.strftime(DATE_FORMAT)
+                    yield date, report.get(date, [])
+                    start += timedelta(days=1)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
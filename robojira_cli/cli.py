@@ -2,12 +2,22 @@ from __future__ import annotations
 
 import argparse
 import calendar
+import importlib
+import importlib.util
 import json
+import sys
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Callable, List
-
-from robojira_cli.helpers.export_func import json_export
+from typing import Dict
+
+from robojira_cli.helpers.profiler import Profiler
+from robojira_cli.helpers.timing import StartupTimer
+from robojira_cli.helpers.constants import (
+    DATE_FORMAT,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_JIRA_RATE_LIMIT,
+    WATCH_INTERVAL,
+)
 
 try:
     from .config_helper import (
@@ -16,13 +26,16 @@ try:
         read_config_file,
         validate_config_data,
         get_config_file,
+        get_data_dir,
+        get_jira_sites,
+    )
+    from .helpers.dateutils import (
+        format_day,
+        get_current_year,
+        is_single_month,
+        last_day_of_month,
     )
-    from .excel_export import ExcelExporter
-    from .helpers.classes import UserReport, WorklogReport
-    from .helpers.dateutils import get_current_year, last_day_of_month
-    from .helpers.report_analyzer import analyze_reports
-    from .helpers.working_days import WorkingDaysApi
-    from .jira_client import JiraApi
+    from .helpers.text_decoration import clear_progress, print_in_place
 except ImportError:
     from config_helper import (
         is_config_file_exists,
@@ -30,30 +43,73 @@ except ImportError:
         read_config_file,
         validate_config_data,
         get_config_file,
+        get_data_dir,
+        get_jira_sites,
     )
-    from excel_export import ExcelExporter
-    from helpers.classes import UserReport, WorklogReport
     from helpers.dateutils import (
+        format_day,
         get_current_year,
+        is_single_month,
         last_day_of_month,
     )
-    from helpers.report_analyzer import analyze_reports
-    from helpers.working_days import WorkingDaysApi
-    from jira_client import JiraApi
+    from helpers.text_decoration import clear_progress, print_in_place
 
 current_year = get_current_year()
 current_month = datetime.now().month
 default_excel_report_dir = Path.home()
 
-__output_formats: Dict[
-    str, Callable[[Dict[str, List[WorklogReport]], Path], Path]
-] = {"json": json_export}
+# Exporters live in helpers.export_func and are imported only when used
+__output_formats: Dict[str, str] = {
+    "json": "json_export",
+    "csv": "csv_export",
+    "tsv": "tsv_export",
+    "ndjson": "ndjson_export",
+}
+if importlib.util.find_spec("pyarrow"):
+    __output_formats.update(parquet="parquet_export", arrow="arrow_export")
 __execution_modes = ["manager", "self"]
+__commands = ["report", "serve", "daemon"]
+# Clients by config, so a daemon keeps sessions and caches warm between runs
+__clients: Dict[str, tuple] = {}
+
+timer = StartupTimer()
+timer.mark("cli imports")
+profiler = Profiler()
+
+
+def load(module: str):
+    # Heavy modules (requests, xlsxwriter, sqlite3) are imported only by
+    # the command that needs them
+    timer.mark("command")
+    try:
+        loaded = importlib.import_module(f"robojira_cli.{module}")
+    except ImportError:
+        loaded = importlib.import_module(module)
+    timer.mark(f"import {module}")
+    return loaded
+
+
+def date_argument(value: str) -> datetime:
+    try:
+        return datetime.strptime(value, DATE_FORMAT)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Expected YYYY-MM-DD, got {value}")
+
 
 robojira_parser = argparse.ArgumentParser(
     description="Script to work with Jira worklog"
 )
 
+robojira_parser.add_argument(
+    "command",
+    help=f"One of {__commands}. 'serve' keeps the local worklog store "
+    "current from Jira webhooks. 'daemon' keeps clients and caches in "
+    "memory and answers reports forwarded by later runs. Default: report",
+    nargs="?",
+    choices=__commands,
+    default="report",
+)
+
 robojira_parser.add_argument(
     "-m", "--month", help="Month number", type=int, default=current_month
 )
@@ -66,6 +122,22 @@ robojira_parser.add_argument(
     default=current_year,
 )
 
+robojira_parser.add_argument(
+    "--from",
+    dest="from_date",
+    help="Report start date (YYYY-MM-DD). Overrides --month/--year",
+    type=date_argument,
+    default=None,
+)
+
+robojira_parser.add_argument(
+    "--to",
+    dest="to_date",
+    help="Report end date (YYYY-MM-DD), used with --from. Default: today",
+    type=date_argument,
+    default=None,
+)
+
 robojira_parser.add_argument(
     "--mode",
     help=f"Script execution mode: {__execution_modes}",
@@ -92,8 +164,8 @@ robojira_parser.add_argument(
 robojira_parser.add_argument(
     "-o",
     "--output",
-    help="Provide output format for self mode. "
-    f"One of {list(__output_formats.keys())}",
+    help="Provide output format. In manager mode it replaces the Excel "
+    f"report. One of {list(__output_formats.keys())}",
     type=str,
     default="",
 )
@@ -107,8 +179,177 @@ robojira_parser.add_argument(
     type=int
 )
 
+robojira_parser.add_argument(
+    "-w",
+    "--watch",
+    help="Keep the today report open and refresh it when worklogs change. "
+    f"Polls every SECONDS (default: {WATCH_INTERVAL}), backing off while "
+    "nothing changes",
+    nargs="?",
+    const=WATCH_INTERVAL,
+    default=None,
+    type=float,
+    metavar="SECONDS",
+)
+
+robojira_parser.add_argument(
+    "--port",
+    help="Port for 'serve'. Default: webhook_port from the config",
+    type=int,
+    default=None,
+)
+
+robojira_parser.add_argument(
+    "--no-store",
+    help="Fetch everything from Jira instead of the local worklog store",
+    action="store_true",
+    default=False,
+)
+
+cassette_group = robojira_parser.add_mutually_exclusive_group()
+
+cassette_group.add_argument(
+    "--record",
+    help="Save every Jira and working days response to DIR",
+    default=None,
+    metavar="DIR",
+)
+
+cassette_group.add_argument(
+    "--replay",
+    help="Serve Jira and working days responses saved by --record from DIR "
+    "without network access",
+    default=None,
+    metavar="DIR",
+)
+
+robojira_parser.add_argument(
+    "--profile",
+    help="Print request and stage statistics, or write them as JSON "
+    "to the given file",
+    nargs="?",
+    const="",
+    default=None,
+    metavar="JSON_FILE",
+)
+
+robojira_parser.add_argument(
+    "--timing",
+    help="Print how long startup, imports and the command took",
+    action="store_true",
+    default=False,
+)
+
+
+def get_daemon_socket() -> Path:
+    return get_data_dir().joinpath("daemon.sock")
+
+
+def create_clients(config_data: dict, no_store: bool):
+    key = json.dumps([config_data, no_store], sort_keys=True)
+    if key not in __clients:
+        __clients[key] = new_clients(config_data, no_store)
+    return __clients[key]
+
+
+def new_clients(config_data: dict, no_store: bool, cached: bool = True):
+    cache = None
+    if cached:
+        cache = load("helpers.file_cache").FileCache(
+            get_data_dir().joinpath("cache")
+        )
+
+    working_day_api = load("helpers.working_days").WorkingDaysApi(
+        config_data.get("working_day_api_token", ""),
+        cache,
+        config_data.get("holiday_calendars"),
+    )
+    # Each site gets its own session, limits and store; file cache keys
+    # already include the domain
+    sites = []
+    for site in get_jira_sites(config_data):
+        store = None
+        if config_data.get("local_store", True) and not no_store:
+            store = load("helpers.worklog_store").WorklogStore(
+                get_data_dir().joinpath(f"{site['jira_domain']}.db")
+            )
+        sites.append(
+            load("jira_client").JiraApi(
+                site["jira_domain"],
+                site["jira_username"],
+                site["jira_api_token"],
+                site.get("jira_concurrency", DEFAULT_CONCURRENCY),
+                store,
+                cache,
+                site.get("jira_rate_limit", DEFAULT_JIRA_RATE_LIMIT),
+            )
+        )
+    if len(sites) == 1:
+        return sites[0], working_day_api
+    return load("jira_sites").JiraSites(sites), working_day_api
+
+
+def format_today_report(report: dict) -> str:
+    lines = []
+    spent = 0
+    for date, worklogs in report.items():
+        lines.append(f"🏔️ Report for: {date} 🏔️\n")
+        for worklog in worklogs:
+            spent += worklog.time_in_seconds
+            lines.append(f"{worklog.title} {worklog.spent_time}")
+
+    spent_hours = round(spent / (60 * 60), 2)
+    lines.append(f"Total spent time: {spent_hours}h")
+    return "\n".join(lines)
+
+
+def is_forwarded(args: argparse.Namespace) -> bool:
+    # Interactive commands and local diagnostics always run in this process
+    return (
+        args.command == "report"
+        and args.watch is None
+        and args.profile is None
+        and args.record is None
+        and args.replay is None
+        and not args.show_config
+        and get_daemon_socket().exists()
+    )
+
+
+def export_output(
+    output: str, matrix, config_data: dict, per_user: bool = False
+):
+    export_func = load("helpers.export_func")
+    func = getattr(export_func, __output_formats[output])
+    folder = Path(config_data.get("excel_folder", default_excel_report_dir))
+    with profiler.span("export"):
+        file = func(matrix, folder, per_user)
+    print("Output file:")
+    print(str(file.absolute()))
+
 
 def main():
+    args = robojira_parser.parse_args()
+    timer.mark("arguments")
+    if is_forwarded(args):
+        code = load("daemon").forward(sys.argv[1:], get_daemon_socket())
+        if code is not None:
+            timer.mark("daemon")
+            if args.timing:
+                timer.report()
+            if code:
+                sys.exit(code)
+            return
+    try:
+        run(args)
+    finally:
+        if args.timing:
+            timer.report()
+        if args.profile is not None:
+            profiler.report(Path(args.profile) if args.profile else None)
+
+
+def run(args: argparse.Namespace):
     if not is_config_file_exists():
         file = create_config_file()
         print("Config file created, please, fill it")
@@ -118,8 +359,8 @@ def main():
     config_data = read_config_file()
     if not validate_config_data(config_data):
         return
+    timer.mark("config")
 
-    args = robojira_parser.parse_args()
     if args.mode not in __execution_modes:
         print(f"--mode should be on of {__execution_modes}")
         return
@@ -129,64 +370,124 @@ def main():
         print(json.dumps(config_data, indent=4))
         return
 
+    if args.watch is not None:
+        if args.watch <= 0:
+            print("--watch interval should be positive")
+            return
+        if args.today is None:
+            args.today = 0
+
     user = config_data["jira_username"]
-    token = config_data["jira_api_token"]
-    jira_domain = config_data["jira_domain"]
     user_country_code = config_data["my_country_code"]
 
-    working_day_token = config_data["working_day_api_token"]
-
     month = args.month
     year = args.year
     short_report = args.short
 
-    month_name = calendar.month_name[month]
+    if args.to_date and not args.from_date:
+        print("--to needs --from")
+        return
+    if args.from_date:
+        start_date = args.from_date
+        end_date = args.to_date or datetime.today().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        period_name = (
+            f"{start_date.strftime(DATE_FORMAT)} - "
+            f"{end_date.strftime(DATE_FORMAT)}"
+        )
+    else:
+        start_date = datetime(year, month, 1)
+        end_date = last_day_of_month(month, year)
+        period_name = f"{calendar.month_name[month]} ({month})"
+    if end_date < start_date:
+        print("--to should not be earlier than --from")
+        return
+    short_days = is_single_month(start_date, end_date)
 
-    working_day_api = WorkingDaysApi(working_day_token)
-    jira_api = JiraApi(jira_domain, user, token)
+    cassette_dir = args.record or args.replay
+    if cassette_dir:
+        if args.command != "report" or args.watch is not None:
+            print("--record and --replay only work with one-off reports")
+            return
+        # Without the store and file caches every lookup goes through the
+        # session, so a cassette alone is enough to replay the report
+        jira_api, working_day_api = new_clients(
+            config_data, no_store=True, cached=False
+        )
+        cassette = load("helpers.cassette").Cassette(
+            Path(cassette_dir), replay=bool(args.replay)
+        )
+        for site in jira_api.sites:
+            site.session.cassette = cassette
+        working_day_api.session.cassette = cassette
+    else:
+        jira_api, working_day_api = create_clients(config_data, args.no_store)
+    if args.profile is not None:
+        for site in jira_api.sites:
+            site.session.profiler = profiler
+        working_day_api.session.profiler = profiler
+
+    if args.command == "serve":
+        # Webhooks are registered per site; serve the primary one
+        load("webhook_server").serve(
+            config_data, jira_api.sites[0], port=args.port
+        )
+        return
+
+    if args.command == "daemon":
+        load("daemon").serve_daemon(
+            lambda argv: run(robojira_parser.parse_args(argv)),
+            get_daemon_socket(),
+        )
+        return
 
     if args.today is not None:
-        spent = 0
         date = datetime.today() - timedelta(days=args.today)
 
-        for date, worklogs in jira_api.get_report(date).items():
-            print(f"🏔️ Report for: {date} 🏔️\n")
-            for worklog in worklogs:
-                spent += worklog.time_in_seconds
-                print(worklog.title, worklog.spent_time)
-
-        spent_hours = round(spent / (60 * 60), 2)
-        print(f"Total spent time: {spent_hours}h")
+        if args.watch is not None:
+            lines = 0
+            try:
+                for report in jira_api.watch_report(date, args.watch):
+                    clear_progress()
+                    lines = print_in_place(format_today_report(report), lines)
+            except KeyboardInterrupt:
+                clear_progress()
+        else:
+            with profiler.span("fetch"):
+                report = jira_api.get_report(date)
+            print(format_today_report(report))
 
     elif args.mode == "self":
         print("🤓 Running in self-check mode 🤓")
-        not_working_days = working_day_api.get_not_working_days(
-            month, user_country_code, year
-        )
-        print(f"Not working day for {month_name} ({month})")
-        print("\t" + ", ".join([str(dt) for dt in not_working_days]))
-        reports = jira_api.get_month_report(
-            month, year, print_report=True, short_report=args.short
+        with profiler.span("holidays"):
+            not_working_days = working_day_api.get_not_working_dates(
+                start_date, end_date, user_country_code
+            )
+        print(f"Not working day for {period_name}")
+        print(
+            "\t"
+            + ", ".join(format_day(dt, short_days) for dt in not_working_days)
         )
-        start_date = datetime(year, month, 1)
-        end_date = last_day_of_month(month, year)
+        with profiler.span("fetch"):
+            reports = jira_api.get_period_report(
+                start_date,
+                end_date,
+                print_report=True,
+                short_report=args.short,
+            )
 
-        analyze_reports(
-            reports,
-            not_working_days,
-            start_date,
-            end_date,
-            user,
-            print_output=not short_report,
-        )
+        aggregate = load("helpers.aggregate")
+        report_analyzer = load("helpers.report_analyzer")
+        with profiler.span("analyze"):
+            matrix = aggregate.HoursMatrix(start_date, end_date)
+            user_index = matrix.add_user(user, reports, not_working_days)
+            report_analyzer.analyze_hours(
+                matrix, user_index, print_output=not short_report
+            )
 
         if args.output and args.output in __output_formats:
-            func = __output_formats[args.output]
-            folder = Path(
-                config_data.get("excel_folder", default_excel_report_dir)
-            )
-            print("Output file:")
-            print(str(func(reports, folder).absolute()))
+            export_output(args.output, matrix, config_data)
 
     elif args.mode == "manager":
         if "users" not in config_data:
@@ -196,32 +497,48 @@ def main():
         if not isinstance(users, dict):
             print("'users' should be a dict")
             return
-        user_reports = []
-
-        for code, users in users.items():
-            not_working_days = working_day_api.get_not_working_days(month, code)
+        manager_report = load("manager_report").build_manager_report(
+            jira_api,
+            working_day_api,
+            users,
+            start_date,
+            end_date,
+            profiler,
+        )
 
-            print(f"Not working day for {month_name} ({month}). Code: {code}")
-            print("\t" + ", ".join([str(dt) for dt in not_working_days]))
+        for code, not_working_days in manager_report.not_working_days.items():
+            print(f"Not working day for {period_name}. Code: {code}")
+            print(
+                "\t"
+                + ", ".join(
+                    format_day(dt, short_days) for dt in not_working_days
+                )
+            )
+        for user, error in manager_report.failures.items():
+            print(f"Skipping {user}: {error}")
 
-            for user in users:
-                reports = jira_api.get_month_report(month, user=user)
-                start_date = datetime(year, month, 1)
-                end_date = last_day_of_month(month, year)
-                analyze_reports(
-                    reports,
-                    not_working_days,
+        if args.output and args.output in __output_formats:
+            matrix = load("helpers.aggregate").HoursMatrix(start_date, end_date)
+            for user_report in manager_report.user_reports:
+                matrix.add_user(
+                    user_report.user,
+                    user_report.reports,
+                    user_report.not_working_days,
+                )
+            export_output(args.output, matrix, config_data, per_user=True)
+        else:
+            excel_folder = config_data.get(
+                "excel_folder", default_excel_report_dir
+            )
+            exporter = load("excel_export").ExcelExporter
+            with profiler.span("export"):
+                exporter(
+                    manager_report.user_reports,
                     start_date,
                     end_date,
-                    user,
-                    print_output=False,
-                )
-
-                user_reports.append(
-                    UserReport(user, reports, not_working_days, month, year)
+                    Path(excel_folder),
                 )
-        excel_folder = config_data.get("excel_folder", default_excel_report_dir)
-        ExcelExporter(user_reports, month, year, Path(excel_folder))
+    timer.mark("command")
 
 
 if __name__ == "__main__":
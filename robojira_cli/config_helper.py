@@ -1,12 +1,29 @@
 import json
 import re
 from pathlib import Path
+from typing import List
+
+# Per-site keys that default to the top-level value when a site omits them
+SITE_KEYS = [
+    "jira_username",
+    "jira_api_token",
+    "jira_concurrency",
+    "jira_rate_limit",
+]
 
 
 def get_config_file() -> Path:
     return Path.home().joinpath(".robojira.json")
 
 
+def get_data_dir() -> Path:
+    folder = Path.home().joinpath(".robojira")
+    # Holds the worklog store, cache and daemon socket, so it is owner-only
+    folder.mkdir(mode=0o700, exist_ok=True)
+    folder.chmod(0o700)
+    return folder
+
+
 def create_config_file() -> Path:
     file = get_config_file()
     file.unlink(missing_ok=True)
@@ -16,9 +33,16 @@ def create_config_file() -> Path:
     "jira_username": "", # Your Jira username (email)
     "jira_api_token": "", # Your Jira token (https://id.atlassian.com/manage-profile/security/api-tokens)
     "jira_domain": "", # Your Jira domain
+    "jira_sites": [], # Extra Jira sites to merge: [{{"jira_domain": "", "jira_username": "", "jira_api_token": ""}}]
     "working_day_api_token": "", # Your working day api token (https://rapidapi.com/joursouvres-api/api/working-days)"
     "my_country_code": "UA", # Change to your country code
+    "holiday_calendars": {{}}, # Optional offline ICS/JSON holiday files per country code
     "users": {{}}, # Fill for manager mode
+    "jira_concurrency": 8, # Max parallel Jira requests
+    "jira_rate_limit": 20, # Max Jira requests per second
+    "local_store": true, # Keep worklogs in a local database and sync only changes
+    "webhook_port": 8765, # Port `robojira serve` listens on for Jira webhooks
+    "webhook_secret": "", # Secret set on the Jira webhook, if any
     "excel_folder": "{home_dir}" # Update if needed
 }}"""
 
@@ -36,6 +60,18 @@ def read_config_file() -> dict:
     return json.loads(re.sub(r"\s*#\s*.+", "", text))
 
 
+def get_jira_sites(data: dict) -> List[dict]:
+    sites = [{"jira_domain": data["jira_domain"]}]
+    sites.extend(data.get("jira_sites", []))
+    return [
+        {
+            **{key: data[key] for key in SITE_KEYS if key in data},
+            **site,
+        }
+        for site in sites
+    ]
+
+
 def validate_config_data(data: dict) -> bool:
     errors = []
     for key in [
@@ -45,12 +81,34 @@ def validate_config_data(data: dict) -> bool:
         "working_day_api_token",
         "my_country_code",
     ]:
+        if key == "working_day_api_token" and data.get("holiday_calendars"):
+            continue
         if key in data:
             if not data[key]:
                 errors.append(f"Empty value for '{key}'")
         else:
             errors.append(f"Missing key '{key}'")
 
+    sites = data.get("jira_sites", [])
+    if not isinstance(sites, list):
+        errors.append("'jira_sites' should be a list")
+    else:
+        for index, site in enumerate(sites):
+            if not isinstance(site, dict) or not site.get("jira_domain"):
+                errors.append(f"Missing 'jira_domain' in 'jira_sites'[{index}]")
+
+    for site in [data, *(sites if isinstance(sites, list) else [])]:
+        if not isinstance(site, dict):
+            continue
+        rate = site.get("jira_rate_limit")
+        if rate is not None and (
+            isinstance(rate, bool)
+            or not isinstance(rate, (int, float))
+            or rate <= 0
+        ):
+            errors.append("'jira_rate_limit' should be a positive number")
+            break
+
     if errors:
         print("\n".join(errors))
         return False
@@ -0,0 +1,126 @@
+import json
+import os
+import socket
+import socketserver
+import sys
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+from pathlib import Path
+from typing import Callable, List, Optional
+
+Runner = Callable[[List[str]], None]
+
+
+class StreamWriter:
+    # File-like object that forwards print() output to the client
+    def __init__(self, connection: socket.socket, stream: str):
+        self.connection = connection
+        self.stream = stream
+
+    def write(self, data: str) -> int:
+        if data:
+            send(self.connection, {"stream": self.stream, "data": data})
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def isatty(self) -> bool:
+        return False
+
+
+def send(connection: socket.socket, message: dict):
+    connection.sendall(json.dumps(message).encode() + b"\n")
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    runner: Runner
+
+    def handle(self):
+        try:
+            argv = json.loads(self.rfile.readline())["argv"]
+        except (ValueError, KeyError, TypeError):
+            # Liveness probes connect and hang up without a request
+            return
+
+        code = 0
+        stdout = StreamWriter(self.request, "stdout")
+        stderr = StreamWriter(self.request, "stderr")
+        try:
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    self.runner(argv)
+                except SystemExit as error:
+                    code = error.code if isinstance(error.code, int) else 1
+                except Exception:
+                    traceback.print_exc()
+                    code = 1
+            send(self.request, {"exit": code})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve_daemon(runner: Runner, socket_path: Path):
+    if socket_path.exists():
+        if is_running(socket_path):
+            print(f"robojira daemon is already running on {socket_path}")
+            return
+        socket_path.unlink()
+
+    handler = type(
+        "Handler", (DaemonHandler,), {"runner": staticmethod(runner)}
+    )
+    # The socket runs reports with the user's credentials, so it is
+    # created owner-only instead of being chmod-ed after bind
+    umask = os.umask(0o077)
+    try:
+        server = socketserver.UnixStreamServer(str(socket_path), handler)
+    finally:
+        os.umask(umask)
+    print(f"robojira daemon is listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+
+
+def connect(socket_path: Path) -> Optional[socket.socket]:
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(str(socket_path))
+    except OSError:
+        connection.close()
+        return None
+    return connection
+
+
+def is_running(socket_path: Path) -> bool:
+    connection = connect(socket_path)
+    if connection is None:
+        return False
+    connection.close()
+    return True
+
+
+def forward(argv: List[str], socket_path: Path) -> Optional[int]:
+    # None means there is no daemon to talk to and the command runs locally
+    connection = connect(socket_path)
+    if connection is None:
+        return None
+
+    with connection, connection.makefile("rb") as reader:
+        send(connection, {"argv": argv})
+        for line in reader:
+            message = json.loads(line)
+            if "exit" in message:
+                return message["exit"]
+            stream = (
+                sys.stderr if message["stream"] == "stderr" else sys.stdout
+            )
+            stream.write(message["data"])
+            stream.flush()
+    # The daemon went away mid-command
+    return 1
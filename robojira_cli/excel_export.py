@@ -1,7 +1,7 @@
 import calendar
-from datetime import datetime, timedelta
+from datetime import datetime
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterable, List, Tuple
 
 import xlsxwriter
 from xlsxwriter.utility import xl_rowcol_to_cell
@@ -9,31 +9,78 @@ from xlsxwriter.utility import xl_rowcol_to_cell
 from robojira_cli.helpers.constants import DATE_FORMAT
 
 try:
-    from robojira_cli.helpers.classes import UserReport
-    from robojira_cli.helpers.dateutils import last_day_of_month
-    from robojira_cli.helpers.report_analyzer import analyze_reports
+    from robojira_cli.helpers.aggregate import HoursMatrix
+    from robojira_cli.helpers.classes import UserReport, WorklogReport
+    from robojira_cli.helpers.dateutils import (
+        format_day,
+        get_dates,
+        is_single_month,
+        split_period,
+    )
+    from robojira_cli.helpers.report_analyzer import analyze_hours
 except ImportError:
-    from helpers.classes import UserReport
-    from helpers.dateutils import last_day_of_month
-    from helpers.report_analyzer import analyze_reports
+    from helpers.aggregate import HoursMatrix
+    from helpers.classes import UserReport, WorklogReport
+    from helpers.dateutils import (
+        format_day,
+        get_dates,
+        is_single_month,
+        split_period,
+    )
+    from helpers.report_analyzer import analyze_hours
+
+
+class ColumnWidths:
+    def __init__(self):
+        self.widths: Dict[int, int] = {}
+
+    def track(self, column: int, value):
+        width = max(len(line) for line in str(value).split("\n"))
+        self.widths[column] = max(self.widths.get(column, 0), width)
+
+    def apply(self, ws):
+        # autofit() needs the whole sheet in memory
+        for column, width in self.widths.items():
+            ws.set_column(column, column, min(width + 2, 255))
 
 
 class ExcelExporter:
     def __init__(
         self,
-        user_reports: List[UserReport],
-        month: int,
-        year: int,
+        user_reports: Iterable[UserReport],
+        start_date: datetime,
+        end_date: datetime,
         folder: Path,
     ):
         key = datetime.now().strftime("%H_%M")
-        self.month_name = calendar.month_name[month]
-        self.month = month
-        self.year = year
-        path = folder.joinpath(f"Jira_report_{self.month_name}_{key}.xlsx")
-        self.wb = xlsxwriter.Workbook(path)
+        self.start_date = start_date
+        self.end_date = end_date
+        if is_single_month(start_date, end_date):
+            name = calendar.month_name[start_date.month]
+        else:
+            name = (
+                f"{start_date.strftime(DATE_FORMAT)}_"
+                f"{end_date.strftime(DATE_FORMAT)}"
+            )
+        path = folder.joinpath(f"Jira_report_{name}_{key}.xlsx")
+        # Rows are written strictly top to bottom, so each finished row can
+        # be flushed to disk instead of keeping the whole workbook in memory
+        self.wb = xlsxwriter.Workbook(path, {"constant_memory": True})
         self.summary_ws = self.wb.add_worksheet("Summary")
+        self.summary_widths = ColumnWidths()
+        self.period_sheets = []
+        for sheet_name, by_week in [("Months", False), ("Weeks", True)]:
+            periods = split_period(start_date, end_date, by_week)
+            if len(periods) > 1:
+                ws = self.wb.add_worksheet(sheet_name)
+                self.period_sheets.append((ws, ColumnWidths(), periods))
+        # constant_memory keeps a temp file open per sheet until close, so
+        # every user's details go to one sheet instead of a sheet per user
+        self.details_ws = self.wb.add_worksheet("Details")
+        self.details_widths = ColumnWidths()
+        self.details_row = 0
         self.reports = user_reports
+        self.matrix = HoursMatrix(start_date, end_date)
         self._formats = {}
         self.create_formats()
         self.fill_summary_page()
@@ -76,155 +123,204 @@ class ExcelExporter:
 
     def fill_summary_page(self):
         ws = self.summary_ws
-        ws.merge_range(1, 0, 2, 0, "Employees", self.format("bold_center"))
-
-        delta = timedelta(days=1)
-        start_date = datetime(self.year, self.month, 1)
-        end_date = last_day_of_month(self.month, self.year)
-        column = 1
-        user_added = False
+        dates = get_dates(self.start_date, self.end_date)
 
-        while start_date <= end_date:
-            self.create_header(column, start_date)
+        self.write_report_header(len(dates))
+        self.create_header(dates)
+        self.summary_widths.track(0, "Employees")
+        for period_ws, widths, periods in self.period_sheets:
+            self.create_period_header(period_ws, widths, periods)
 
-            date = start_date.strftime(DATE_FORMAT)
-            row = 3
-            for user_report in self.reports:
-                self.fill_user_row(user_report, row, column, user_added, date)
-                row += 1
-
-            column += 1
-            user_added = True
-            start_date += delta
+        row = 3
+        column = len(dates) + 1
+        for user_report in self.reports:
+            user_index = self.matrix.add_user(
+                user_report.user,
+                user_report.reports,
+                user_report.not_working_days,
+            )
+            self.fill_user_row(user_index, row)
+            self.populate_total_info(user_index, row, column)
+            for period_ws, widths, periods in self.period_sheets:
+                self.fill_period_row(
+                    period_ws, widths, user_index, row - 1, periods
+                )
+            row += 1
 
-        self.populate_total_info(column)
+        self.summary_widths.apply(ws)
+        self.details_widths.apply(self.details_ws)
+        for period_ws, widths, _ in self.period_sheets:
+            widths.apply(period_ws)
 
-        ws.autofit()
-        self.write_report_header(end_date)
+    def create_period_header(
+        self,
+        ws,
+        widths: ColumnWidths,
+        periods: List[Tuple[str, datetime, datetime]],
+    ):
+        bold_center = self.format("bold_center")
+        center_border_bold = self.format("center_border_bold")
+        for index, (name, _, _) in enumerate(periods):
+            column = index * 2 + 1
+            ws.merge_range(0, column, 0, column + 1, name, bold_center)
+        ws.merge_range(0, 0, 1, 0, "Employees", bold_center)
+        widths.track(0, "Employees")
+        for index in range(len(periods)):
+            column = index * 2 + 1
+            ws.write(1, column, "WH", center_border_bold)
+            ws.write(1, column + 1, "Expected WH", center_border_bold)
+            widths.track(column + 1, "Expected WH")
 
-    def create_user_page(self, user_report: UserReport) -> str:
-        ws = self.wb.add_worksheet(user_report.user)
-        ws.write(0, 0, "Not working days", self.format("bold"))
-        days = [str(dt) for dt in user_report.not_working_days]
-        ws.write(0, 1, ",".join(days))
+    def fill_period_row(
+        self,
+        ws,
+        widths: ColumnWidths,
+        user_index: int,
+        row: int,
+        periods: List[Tuple[str, datetime, datetime]],
+    ):
+        center_border = self.format("center_border")
+        user = self.matrix.users[user_index]
+        ws.write(row, 0, user)
+        widths.track(0, user)
+        for index, (_, start_date, end_date) in enumerate(periods):
+            column = index * 2 + 1
+            spent_time = self.matrix.total_seconds(
+                user_index, start_date, end_date
+            )
+            spent_hours = round(spent_time / 60 / 60, 2)
+            ws.write(row, column, spent_hours, center_border)
+            widths.track(column, spent_hours)
+            ws.write(
+                row,
+                column + 1,
+                self.matrix.expected_hours(user_index, start_date, end_date),
+                center_border,
+            )
 
-        row = 1
+    def fill_user_details(self, user_index: int) -> str:
+        matrix = self.matrix
+        ws = self.details_ws
+        widths = self.details_widths
         bold = self.format("bold")
         center = self.format("center")
-        for date, reports in user_report.reports.items():
+
+        first_row = self.details_row
+        user = matrix.users[user_index]
+        ws.write(first_row, 0, user, bold)
+        widths.track(0, user)
+        ws.write(first_row + 1, 0, "Not working days", bold)
+        short = is_single_month(self.start_date, self.end_date)
+        holidays = matrix.holiday_mask(user_index)
+        days = ",".join(
+            format_day(day, short)
+            for day, holiday in zip(matrix.dates, holidays)
+            if holiday
+        )
+        ws.write(first_row + 1, 1, days)
+        widths.track(0, "Not working days")
+
+        row = first_row + 2
+        for date, issues in matrix.day_issues(user_index).items():
             ws.write(row, 0, date, bold)
+            widths.track(0, date)
             row += 1
-            for report in reports:
-                ws.write(row, 1, report.title)
-                ws.write(row, 2, report.spent_time, center)
+            for title, seconds in issues:
+                spent_time = WorklogReport(title, seconds).spent_time
+                ws.write(row, 1, title)
+                ws.write(row, 2, spent_time, center)
+                widths.track(1, title)
+                widths.track(2, spent_time)
                 row += 1
 
-        start_date = datetime(self.year, self.month, 1)
-        end_date = last_day_of_month(self.month, self.year)
-
-        analyze = analyze_reports(
-            user_report.reports,
-            user_report.not_working_days,
-            start_date,
-            end_date,
-            user_report.user,
-            False,
-        )
+        analyze = analyze_hours(matrix, user_index, False)
 
         for key, value in analyze.items():
-            ws.write(row, 0, key.replace("_", " ").capitalize(), bold)
+            name = key.replace("_", " ").capitalize()
+            ws.write(row, 0, name, bold)
+            widths.track(0, name)
             if key in ["missing_dates", "ok_days"]:
                 ws.write(row, 1, ", ".join(value))
             else:
                 for val in value:
                     ws.write(row + 1, 1, val)
+                    widths.track(1, val)
                     row += 1
             row += 1
 
-        ws.autofit()
-        return f"internal:'{ws.name}'!A1"
-
-    def create_header(self, column: int, date: datetime):
-        self.summary_ws.write(1, column, date.day, self.format("center_border"))
-        self.summary_ws.write(
-            2, column, date.strftime("%a"), self.format("center_border")
-        )
+        # A blank row between users
+        self.details_row = row + 1
+        return f"internal:'{ws.name}'!{xl_rowcol_to_cell(first_row, 0)}"
 
-    def fill_user_row(
-        self,
-        user_report: UserReport,
-        row: int,
-        column: int,
-        user_added: bool,
-        date: str,
-    ) -> int:
+    def create_header(self, dates: List[datetime]):
         ws = self.summary_ws
-        if not user_added:
-            ws.write_url(
-                row,
-                0,
-                self.create_user_page(user_report),
-                string=user_report.user,
-            )
-        if date in user_report.reports:
-            reports = user_report.reports[date]
-            spent_time = round(
-                sum(worklog.time_in_seconds for worklog in reports), 2
-            )
-            spent_hours = round(spent_time / 60 / 60, 2)
-
-            if spent_hours > 8:
-                cell_format = self.format("overtime_bg")
-            elif spent_hours < 8:
-                cell_format = self.format("not_enough_bg")
-            else:
-                cell_format = self.format("green_bg")
-            ws.write(row, column, spent_hours, cell_format)
-            return spent_time
+        center_border = self.format("center_border")
+        center_border_bold = self.format("center_border_bold")
+        column = len(dates) + 1
+        short = is_single_month(self.start_date, self.end_date)
+        for index, date in enumerate(dates, 1):
+            day = date.day if short else date.strftime("%d.%m")
+            ws.write(1, index, day, center_border)
+        ws.merge_range(1, 0, 2, 0, "Employees", self.format("bold_center"))
+        for index, date in enumerate(dates, 1):
+            ws.write(2, index, date.strftime("%a"), center_border)
+        ws.write(2, column, "Total WH", center_border_bold)
+        ws.write(2, column + 1, "Expected WH", center_border_bold)
+        ws.write(2, column + 2, "Difference", center_border_bold)
+        self.summary_widths.track(column, "Total WH")
+        self.summary_widths.track(column + 1, "Expected WH")
+        self.summary_widths.track(column + 2, "Difference")
 
-        else:
-            day = int(date.split("-")[-1])
-            if day in user_report.not_working_days:
-                cell_format = self.format("holiday_bg")
+    def fill_user_row(self, user_index: int, row: int):
+        ws = self.summary_ws
+        user = self.matrix.users[user_index]
+        ws.write_url(
+            row, 0, self.fill_user_details(user_index), string=user
+        )
+        self.summary_widths.track(0, user)
+        holidays = self.matrix.holiday_mask(user_index)
+        for column, spent_hours in enumerate(self.matrix.hours(user_index), 1):
+            if spent_hours:
+                if spent_hours > 8:
+                    cell_format = self.format("overtime_bg")
+                elif spent_hours < 8:
+                    cell_format = self.format("not_enough_bg")
+                else:
+                    cell_format = self.format("green_bg")
+                ws.write(row, column, spent_hours, cell_format)
+                self.summary_widths.track(column, spent_hours)
             else:
-                cell_format = self.format("red_bg")
-            ws.write(row, column, "", cell_format)
-
-            return 0
+                if holidays[column - 1]:
+                    cell_format = self.format("holiday_bg")
+                else:
+                    cell_format = self.format("red_bg")
+                ws.write(row, column, "", cell_format)
 
-    def populate_total_info(self, column):
+    def populate_total_info(self, user_index: int, row: int, column: int):
         ws = self.summary_ws
-        row = 3
         center_border = self.format("center_border")
-        center_border_bold = self.format("center_border_bold")
-        ws.write(row - 1, column, "Total WH", center_border_bold)
-        ws.write(row - 1, column + 1, "Expected WH", center_border_bold)
-        ws.write(row - 1, column + 2, "Difference", center_border_bold)
-        for user_report in self.reports:
-            start_cell = xl_rowcol_to_cell(row, 1)
-            end_cell = xl_rowcol_to_cell(row, column - 1)
-            ws.write_formula(
-                row, column, f"=SUM({start_cell}:{end_cell})", center_border
-            )
-            ws.write(
-                row,
-                column + 1,
-                user_report.get_expected_working_hours(),
-                center_border,
-            )
-            diff_real = xl_rowcol_to_cell(row, column + 1)
-            diff_expected = xl_rowcol_to_cell(row, column)
-            ws.write_formula(
-                row, column + 2, f"={diff_expected}-{diff_real}", center_border
-            )
-            row += 1
+        start_cell = xl_rowcol_to_cell(row, 1)
+        end_cell = xl_rowcol_to_cell(row, column - 1)
+        ws.write_formula(
+            row, column, f"=SUM({start_cell}:{end_cell})", center_border
+        )
+        ws.write(
+            row,
+            column + 1,
+            self.matrix.expected_hours(user_index),
+            center_border,
+        )
+        diff_real = xl_rowcol_to_cell(row, column + 1)
+        diff_expected = xl_rowcol_to_cell(row, column)
+        ws.write_formula(
+            row, column + 2, f"={diff_expected}-{diff_real}", center_border
+        )
 
-    def write_report_header(self, end_date: datetime):
-        last_day = end_date.day
+    def write_report_header(self, days: int):
         text = (
-            f"Report period from 01 {self.month_name} {self.year} "
-            f"to {last_day} {self.month_name} {self.year}"
+            f"Report period from {self.start_date.strftime('%d %B %Y')} "
+            f"to {self.end_date.strftime('%d %B %Y')}"
         )
         self.summary_ws.merge_range(
-            0, 1, 0, last_day + 3, text, self.format("bold_center")
+            0, 1, 0, days + 3, text, self.format("bold_center")
         )
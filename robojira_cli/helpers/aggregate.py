@@ -0,0 +1,139 @@
+from array import array
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Tuple
+
+from .classes import StringTable, UserWorklogs, WorklogReport
+from .constants import DATE_FORMAT
+from .dateutils import get_dates
+
+
+class HoursMatrix:
+    def __init__(self, start_date: datetime, end_date: datetime):
+        self.start_date = start_date
+        self.end_date = end_date
+        dates = get_dates(start_date, end_date)
+        self.dates = [date.strftime(DATE_FORMAT) for date in dates]
+        self.date_index = {date: index for index, date in enumerate(self.dates)}
+        self.days = len(self.dates)
+        self.users: List[str] = []
+        # Dense users x days grid, row-major
+        self.seconds = array("q")
+        self.holidays = bytearray()
+        # Per-issue breakdown as parallel columns with interned titles
+        self.titles = StringTable()
+        self.issue_offsets = array("q")
+        self.issue_days = array("i")
+        self.issue_titles = array("i")
+        self.issue_seconds = array("q")
+
+    def add_user(
+        self,
+        user: str,
+        reports: Mapping[str, List[WorklogReport]],
+        not_working_days: Iterable[str],
+    ) -> int:
+        user_index = len(self.users)
+        self.users.append(user)
+        self.issue_offsets.append(len(self.issue_days))
+        row = array("q", bytes(8 * self.days))
+        mask = bytearray(self.days)
+        for date in not_working_days:
+            day = self.date_index.get(date)
+            if day is not None:
+                mask[day] = 1
+
+        if isinstance(reports, UserWorklogs):
+            totals = reports.totals()
+        else:
+            totals = (
+                (date, worklog.title, worklog.time_in_seconds)
+                for date, worklogs in reports.items()
+                for worklog in worklogs
+            )
+        for date, title, seconds in totals:
+            day = self.date_index.get(date)
+            if day is None:
+                continue
+            row[day] += seconds
+            self.issue_days.append(day)
+            self.issue_titles.append(self.titles.intern(title))
+            self.issue_seconds.append(seconds)
+
+        self.seconds.extend(row)
+        self.holidays.extend(mask)
+        return user_index
+
+    def get_columns(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> Tuple[int, int]:
+        start = 0
+        end = self.days
+        if start_date and start_date > self.start_date:
+            start = self.date_index[start_date.strftime(DATE_FORMAT)]
+        if end_date and end_date < self.end_date:
+            end = self.date_index[end_date.strftime(DATE_FORMAT)] + 1
+        return start, end
+
+    def row(self, user_index: int) -> array:
+        offset = user_index * self.days
+        return self.seconds[offset:offset + self.days]
+
+    def holiday_mask(self, user_index: int) -> bytearray:
+        offset = user_index * self.days
+        return self.holidays[offset:offset + self.days]
+
+    def hours(self, user_index: int) -> List[float]:
+        return [round(seconds / 60 / 60, 2) for seconds in self.row(user_index)]
+
+    def total_seconds(
+        self,
+        user_index: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> int:
+        start, end = self.get_columns(start_date, end_date)
+        offset = user_index * self.days
+        return sum(self.seconds[offset + start:offset + end])
+
+    def expected_hours(
+        self,
+        user_index: int,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> int:
+        start, end = self.get_columns(start_date, end_date)
+        offset = user_index * self.days
+        holidays = sum(self.holidays[offset + start:offset + end])
+        return (end - start - holidays) * 8
+
+    def issue_range(self, user_index: int) -> range:
+        start = self.issue_offsets[user_index]
+        end = len(self.issue_days)
+        if user_index + 1 < len(self.users):
+            end = self.issue_offsets[user_index + 1]
+        return range(start, end)
+
+    def iter_rows(self) -> Iterator[Tuple[str, str, str, int]]:
+        # One (user, date, issue, seconds) row per logged issue and day
+        for user_index, user in enumerate(self.users):
+            for index in self.issue_range(user_index):
+                yield (
+                    user,
+                    self.dates[self.issue_days[index]],
+                    self.titles[self.issue_titles[index]],
+                    self.issue_seconds[index],
+                )
+
+    def day_issues(self, user_index: int) -> Dict[str, List[Tuple[str, int]]]:
+        issues: Dict[str, List[Tuple[str, int]]] = {}
+        for index in self.issue_range(user_index):
+            date = self.dates[self.issue_days[index]]
+            issues.setdefault(date, []).append(
+                (
+                    self.titles[self.issue_titles[index]],
+                    self.issue_seconds[index],
+                )
+            )
+        return dict(sorted(issues.items()))
@@ -0,0 +1,65 @@
+import gzip
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Optional
+
+from requests import Request, Response
+from requests.structures import CaseInsensitiveDict
+
+
+def get_request_key(method: str, url: str, **kwargs) -> str:
+    # Auth headers are left out so cassettes hold no credentials
+    prepared = Request(
+        method.upper(), url, params=kwargs.get("params")
+    ).prepare()
+    body = json.dumps(kwargs.get("json"), sort_keys=True)
+    text = f"{prepared.method} {prepared.url}\n{body}"
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class Cassette:
+    def __init__(self, folder: Path, replay: bool = False):
+        if not replay:
+            folder.mkdir(parents=True, exist_ok=True)
+        elif not folder.is_dir():
+            raise ValueError(f"No recorded responses in {folder}")
+        self.folder = folder
+        self.replay = replay
+
+    def _file(self, key: str) -> Path:
+        return self.folder.joinpath(f"{key}.json.gz")
+
+    def load(self, method: str, url: str, **kwargs) -> Optional[Response]:
+        file = self._file(get_request_key(method, url, **kwargs))
+        if not file.is_file():
+            return None
+        with gzip.open(file, "rt") as snapshot:
+            data = json.load(snapshot)
+
+        response = Response()
+        response.status_code = data["status"]
+        response.reason = data["reason"]
+        response.url = data["url"]
+        response.headers = CaseInsensitiveDict(data["headers"])
+        response.encoding = "utf-8"
+        response._content = data["body"].encode("utf-8", "surrogateescape")
+        return response
+
+    def save(self, method: str, url: str, response: Response, **kwargs):
+        file = self._file(get_request_key(method, url, **kwargs))
+        data = {
+            "method": method.upper(),
+            "url": response.url,
+            "status": response.status_code,
+            "reason": response.reason,
+            "headers": {
+                "Content-Type": response.headers.get("Content-Type", "")
+            },
+            "body": response.content.decode("utf-8", "surrogateescape"),
+        }
+        tmp_file = file.with_suffix(f".{threading.get_ident()}.tmp")
+        with gzip.open(tmp_file, "wt") as snapshot:
+            json.dump(data, snapshot)
+        tmp_file.replace(file)
@@ -1,33 +1,136 @@
+from array import array
 from dataclasses import dataclass
-from typing import Dict, List
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
 
-from .dateutils import last_day_of_month
+from .constants import DATE_FORMAT
 
 
 class WorklogReport:
+    __slots__ = ("title", "time_in_seconds")
+
     def __init__(self, title: str, time_in_seconds: int):
         self.title = title
-        spent_time = round(time_in_seconds / 60 / 60, 3)
-        self.spent_time = f"{spent_time}h"
-        self.hours = spent_time
         self.time_in_seconds = time_in_seconds
-        self.summary = f"{title}. {self.spent_time}"
+
+    @property
+    def hours(self) -> float:
+        return round(self.time_in_seconds / 60 / 60, 3)
+
+    @property
+    def spent_time(self) -> str:
+        return f"{self.hours}h"
+
+    @property
+    def summary(self) -> str:
+        return f"{self.title}. {self.spent_time}"
 
     def __repr__(self):
         return self.summary
 
 
+class StringTable:
+    __slots__ = ("values", "indexes")
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.indexes: Dict[str, int] = {}
+
+    def intern(self, value: str) -> int:
+        index = self.indexes.get(value)
+        if index is None:
+            index = self.indexes[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def __getitem__(self, index: int) -> str:
+        return self.values[index]
+
+
+class UserWorklogs(Mapping[str, List[WorklogReport]]):
+    __slots__ = ("dates", "titles", "days", "issues", "seconds")
+
+    def __init__(
+        self,
+        dates: Optional[StringTable] = None,
+        titles: Optional[StringTable] = None,
+    ):
+        # Tables can be shared by every user of a team report
+        self.dates = dates or StringTable()
+        self.titles = titles or StringTable()
+        self.days = array("i")
+        self.issues = array("i")
+        self.seconds = array("q")
+
+    def add(self, date: str, title: str, seconds: int):
+        self.days.append(self.dates.intern(date))
+        self.issues.append(self.titles.intern(title))
+        self.seconds.append(seconds)
+
+    def totals(self) -> Iterator[Tuple[str, str, int]]:
+        grouped: Dict[int, Dict[int, int]] = {}
+        for day, issue, seconds in zip(self.days, self.issues, self.seconds):
+            issues = grouped.setdefault(day, {})
+            issues[issue] = issues.get(issue, 0) + seconds
+        for day in sorted(grouped, key=self.dates.__getitem__):
+            date = self.dates[day]
+            for issue, seconds in grouped[day].items():
+                yield date, self.titles[issue], seconds
+
+    def items(self) -> Iterator[Tuple[str, List[WorklogReport]]]:
+        date, reports = None, []
+        for day, title, seconds in self.totals():
+            if day != date:
+                if reports:
+                    yield date, reports
+                date, reports = day, []
+            reports.append(WorklogReport(title, seconds))
+        if reports:
+            yield date, reports
+
+    def __getitem__(self, date: str) -> List[WorklogReport]:
+        day = self.dates.indexes.get(date)
+        if day is None or day not in self.days:
+            raise KeyError(date)
+        issues: Dict[int, int] = {}
+        for index in range(len(self.days)):
+            if self.days[index] == day:
+                issue = self.issues[index]
+                issues[issue] = issues.get(issue, 0) + self.seconds[index]
+        return [
+            WorklogReport(self.titles[issue], seconds)
+            for issue, seconds in issues.items()
+        ]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(sorted(self.dates[day] for day in set(self.days)))
+
+    def __len__(self) -> int:
+        return len(set(self.days))
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
 @dataclass
 class UserReport:
     user: str
-    reports: Dict[str, List[WorklogReport]]
-    not_working_days: List[int]
-    month: int
-    year: int
-
-    def get_expected_working_hours(self) -> int:
-        last_day = last_day_of_month(self.month, self.year).day
-        days = [
-            day for day in range(last_day) if day not in self.not_working_days
-        ]
-        return len(days) * 8
+    reports: Mapping[str, List[WorklogReport]]
+    not_working_days: List[str]
+    start_date: datetime
+    end_date: datetime
+
+    def get_expected_working_hours(
+        self,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+    ) -> int:
+        start_date = max(start_date or self.start_date, self.start_date)
+        end_date = min(end_date or self.end_date, self.end_date)
+        not_working_days = set(self.not_working_days)
+        days = 0
+        while start_date <= end_date:
+            if start_date.strftime(DATE_FORMAT) not in not_working_days:
+                days += 1
+            start_date += timedelta(days=1)
+        return days * 8
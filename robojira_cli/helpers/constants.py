@@ -1 +1,13 @@
 DATE_FORMAT = "%Y-%m-%d"
+AUTHORS_PER_QUERY = 50
+DEFAULT_CONCURRENCY = 8
+WORKLOG_IDS_PER_REQUEST = 1000
+ACCOUNTS_TTL = 30 * 24 * 60 * 60
+DEFAULT_JIRA_RATE_LIMIT = 20.0
+DEFAULT_WORKING_DAYS_RATE_LIMIT = 5.0
+REPORT_WINDOW_DAYS = 7
+WATCH_INTERVAL = 60
+WATCH_MAX_INTERVAL = 10 * 60
+# Reports skip polling Jira this long after `serve` applied a webhook
+WEBHOOK_FRESHNESS = 60
+DEFAULT_WEBHOOK_PORT = 8765
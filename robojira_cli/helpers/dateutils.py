@@ -1,5 +1,8 @@
 import calendar
-from datetime import datetime
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from .constants import DATE_FORMAT
 
 
 def last_day_of_month(month: int, year: int) -> datetime:
@@ -9,3 +12,55 @@ def last_day_of_month(month: int, year: int) -> datetime:
 
 def get_current_year() -> int:
     return datetime.now().year
+
+
+def get_worklog_date(started: str) -> str:
+    # Jira sends "2024-01-31T10:15:00.000+0200"; the day is its date part
+    if (
+        started[4:5] == started[7:8] == "-"
+        and started[:4].isdigit()
+        and started[5:7].isdigit()
+        and started[8:10].isdigit()
+    ):
+        return started[:10]
+    try:
+        worklog_date = datetime.fromisoformat(started)
+    except ValueError:
+        started = started.split("T")[0]
+        worklog_date = datetime.strptime(started, "%Y-%m-%d")
+    return worklog_date.strftime(DATE_FORMAT)
+
+
+def is_single_month(start_date: datetime, end_date: datetime) -> bool:
+    start = (start_date.year, start_date.month)
+    return start == (end_date.year, end_date.month)
+
+
+def format_day(date: str, short: bool) -> str:
+    return str(int(date.split("-")[-1])) if short else date
+
+
+def get_dates(start_date: datetime, end_date: datetime) -> List[datetime]:
+    dates = []
+    while start_date <= end_date:
+        dates.append(start_date)
+        start_date += timedelta(days=1)
+    return dates
+
+
+def split_period(
+    start_date: datetime, end_date: datetime, by_week: bool = False
+) -> List[Tuple[str, datetime, datetime]]:
+    periods = []
+    while start_date <= end_date:
+        if by_week:
+            period_end = start_date + timedelta(days=6 - start_date.weekday())
+            year, week, _ = start_date.isocalendar()
+            name = f"{year}-W{week:02d}"
+        else:
+            period_end = last_day_of_month(start_date.month, start_date.year)
+            name = start_date.strftime("%B %Y")
+        period_end = min(period_end, end_date)
+        periods.append((name, start_date, period_end))
+        start_date = period_end + timedelta(days=1)
+    return periods
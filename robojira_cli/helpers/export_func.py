@@ -1,17 +1,123 @@
+import csv
 import json
-from datetime import datetime
+from datetime import date, datetime
+from itertools import islice
 from pathlib import Path
-from typing import Dict, List
 
-from robojira_cli.helpers.classes import WorklogReport
+from robojira_cli.helpers.aggregate import HoursMatrix
 
+COLUMNS = ["user", "date", "issue", "seconds"]
+# Rows per Parquet row group / Arrow record batch
+BATCH_ROWS = 64 * 1024
 
-def json_export(data: Dict[str, List[WorklogReport]], folder: Path) -> Path:
-    result = {}
-    for date, reports in data.items():
-        result[date] = "\n".join([report.title for report in reports])
+
+def get_output_file(folder: Path, extension: str) -> Path:
     current_date = datetime.now().strftime("%H_%M")
-    file = folder.joinpath(f"robojira_output_{current_date}.json")
+    return folder.joinpath(f"robojira_output_{current_date}.{extension}")
+
+
+def day_titles(matrix: HoursMatrix, user_index: int) -> dict:
+    return {
+        date: "\n".join([title for title, _ in issues])
+        for date, issues in matrix.day_issues(user_index).items()
+    }
+
+
+# Exporters share one signature; per_user is set for manager reports, and
+# only the JSON shape depends on it since the row formats name every user
+def json_export(matrix: HoursMatrix, folder: Path, per_user: bool) -> Path:
+    if per_user:
+        result = {
+            user: day_titles(matrix, user_index)
+            for user_index, user in enumerate(matrix.users)
+        }
+    else:
+        result = day_titles(matrix, 0) if matrix.users else {}
+    file = get_output_file(folder, "json")
     file.write_text(json.dumps(result, indent=4))
 
     return file
+
+
+def delimited_export(
+    matrix: HoursMatrix, folder: Path, extension: str, delimiter: str
+) -> Path:
+    file = get_output_file(folder, extension)
+    with file.open("w", newline="") as output:
+        writer = csv.writer(output, delimiter=delimiter)
+        writer.writerow(COLUMNS)
+        writer.writerows(matrix.iter_rows())
+    return file
+
+
+def csv_export(matrix: HoursMatrix, folder: Path, per_user: bool) -> Path:
+    return delimited_export(matrix, folder, "csv", ",")
+
+
+def tsv_export(matrix: HoursMatrix, folder: Path, per_user: bool) -> Path:
+    return delimited_export(matrix, folder, "tsv", "\t")
+
+
+def ndjson_export(matrix: HoursMatrix, folder: Path, per_user: bool) -> Path:
+    file = get_output_file(folder, "ndjson")
+    with file.open("w") as output:
+        for row in matrix.iter_rows():
+            output.write(json.dumps(dict(zip(COLUMNS, row))) + "\n")
+    return file
+
+
+def iter_batches(matrix: HoursMatrix, pyarrow, schema):
+    rows = matrix.iter_rows()
+    while True:
+        batch = list(islice(rows, BATCH_ROWS))
+        if not batch:
+            break
+        users, dates, issues, seconds = zip(*batch)
+        yield pyarrow.record_batch(
+            [
+                pyarrow.array(users, pyarrow.string()),
+                pyarrow.array(
+                    [date.fromisoformat(day) for day in dates],
+                    pyarrow.date32(),
+                ),
+                pyarrow.array(issues, pyarrow.string()),
+                pyarrow.array(seconds, pyarrow.int64()),
+            ],
+            schema=schema,
+        )
+
+
+def get_arrow_schema(pyarrow):
+    return pyarrow.schema(
+        [
+            ("user", pyarrow.string()),
+            ("date", pyarrow.date32()),
+            ("issue", pyarrow.string()),
+            ("seconds", pyarrow.int64()),
+        ]
+    )
+
+
+# pyarrow is optional and heavy, so it is imported only by its exporters
+def parquet_export(matrix: HoursMatrix, folder: Path, per_user: bool) -> Path:
+    import pyarrow
+    import pyarrow.parquet
+
+    schema = get_arrow_schema(pyarrow)
+    file = get_output_file(folder, "parquet")
+    with pyarrow.parquet.ParquetWriter(str(file), schema) as writer:
+        for batch in iter_batches(matrix, pyarrow, schema):
+            writer.write_batch(batch)
+    return file
+
+
+def arrow_export(matrix: HoursMatrix, folder: Path, per_user: bool) -> Path:
+    import pyarrow
+    import pyarrow.ipc
+
+    schema = get_arrow_schema(pyarrow)
+    file = get_output_file(folder, "arrow")
+    with pyarrow.ipc.new_file(str(file), schema) as writer:
+        for batch in iter_batches(matrix, pyarrow, schema):
+            writer.write_batch(batch)
+    return file
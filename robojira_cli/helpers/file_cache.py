@@ -0,0 +1,40 @@
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+
+class FileCache:
+    def __init__(self, folder: Path):
+        folder.mkdir(parents=True, exist_ok=True)
+        self.folder = folder
+        # Parsed values by file mtime, so long-lived processes skip re-reads
+        self.memory: Dict[str, Tuple[float, Any]] = {}
+
+    def _file(self, key: str) -> Path:
+        return self.folder.joinpath(re.sub(r"[^\w.-]", "_", key) + ".json")
+
+    def get(self, key: str, ttl: Optional[float] = None) -> Optional[Any]:
+        file = self._file(key)
+        try:
+            mtime = file.stat().st_mtime
+        except OSError:
+            return None
+        if ttl is not None and time.time() - mtime > ttl:
+            return None
+        if key in self.memory and self.memory[key][0] == mtime:
+            return self.memory[key][1]
+        try:
+            value = json.loads(file.read_text())
+        except ValueError:
+            return None
+        self.memory[key] = (mtime, value)
+        return value
+
+    def set(self, key: str, value: Any):
+        file = self._file(key)
+        tmp_file = file.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps(value))
+        tmp_file.replace(file)
+        self.memory[key] = (file.stat().st_mtime, value)
@@ -0,0 +1,20 @@
+import json
+from typing import Any
+
+# Everything robojira reads from a Jira worklog
+WORKLOG_KEYS = ("id", "issueId", "started", "timeSpentSeconds")
+
+
+def prune_object(obj: dict) -> dict:
+    # Called for every decoded object, innermost first. Worklogs lose their
+    # comment bodies, links and author details as soon as they are decoded
+    if "timeSpentSeconds" not in obj or "started" not in obj:
+        return obj
+    worklog = {key: obj[key] for key in WORKLOG_KEYS if key in obj}
+    author = obj.get("updateAuthor") or {}
+    worklog["updateAuthor"] = {"accountId": author.get("accountId")}
+    return worklog
+
+
+def loads(content: bytes) -> Any:
+    return json.loads(content, object_hook=prune_object)
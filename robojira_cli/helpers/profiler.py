@@ -0,0 +1,140 @@
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+ISSUE_KEY = re.compile(r"^[A-Z][A-Z0-9_]*-\d+$")
+
+
+def get_endpoint(method: str, url: str) -> str:
+    segments = []
+    for segment in urlparse(url).path.split("/"):
+        # Keep the API version in /rest/api/3/
+        if segment.isdigit() and segments[-1:] != ["api"]:
+            segment = "{id}"
+        elif ISSUE_KEY.match(segment):
+            segment = "{key}"
+        segments.append(segment)
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+def get_percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(len(values) * percentile))
+    return values[index]
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.errors = 0
+        self.retries = 0
+        self.bytes = 0
+
+    def to_dict(self) -> dict:
+        histogram = {f"<={bound}ms": 0 for bound in LATENCY_BUCKETS}
+        histogram[f">{LATENCY_BUCKETS[-1]}ms"] = 0
+        for latency in self.latencies:
+            for bound in LATENCY_BUCKETS:
+                if latency <= bound:
+                    histogram[f"<={bound}ms"] += 1
+                    break
+            else:
+                histogram[f">{LATENCY_BUCKETS[-1]}ms"] += 1
+        return {
+            "count": len(self.latencies),
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes": self.bytes,
+            "total_ms": round(sum(self.latencies), 1),
+            "p50_ms": round(get_percentile(self.latencies, 0.5), 1),
+            "p95_ms": round(get_percentile(self.latencies, 0.95), 1),
+            "max_ms": round(max(self.latencies, default=0.0), 1),
+            "histogram": histogram,
+        }
+
+
+class Profiler:
+    def __init__(self):
+        self.endpoints: Dict[str, EndpointStats] = {}
+        self.stages: Dict[str, float] = {}
+        self.lock = threading.Lock()
+
+    def record_request(
+        self,
+        method: str,
+        url: str,
+        elapsed: float,
+        status: Optional[int],
+        size: int = 0,
+        retry: bool = False,
+    ):
+        endpoint = get_endpoint(method, url)
+        with self.lock:
+            stats = self.endpoints.setdefault(endpoint, EndpointStats())
+            stats.latencies.append(elapsed * 1000)
+            stats.bytes += size
+            if retry:
+                stats.retries += 1
+            if status is None or status >= 400:
+                stats.errors += 1
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            with self.lock:
+                self.stages[name] = self.stages.get(name, 0.0) + elapsed
+
+    def to_dict(self) -> dict:
+        with self.lock:
+            return {
+                "requests": {
+                    endpoint: stats.to_dict()
+                    for endpoint, stats in sorted(self.endpoints.items())
+                },
+                "stages": {
+                    name: round(seconds * 1000, 1)
+                    for name, seconds in self.stages.items()
+                },
+            }
+
+    def report(self, path: Optional[Path] = None):
+        data = self.to_dict()
+        if path:
+            path.write_text(json.dumps(data, indent=4))
+            print(f"Profile: {path}", file=sys.stderr)
+            return
+
+        print("Requests:", file=sys.stderr)
+        for endpoint, stats in data["requests"].items():
+            print(
+                f"\t{endpoint}: {stats['count']} requests, "
+                f"{stats['errors']} errors, {stats['retries']} retries, "
+                f"{stats['bytes'] / 1024:.1f} KiB, "
+                f"p50 {stats['p50_ms']} ms, p95 {stats['p95_ms']} ms, "
+                f"max {stats['max_ms']} ms",
+                file=sys.stderr,
+            )
+            histogram = ", ".join(
+                f"{bucket}: {count}"
+                for bucket, count in stats["histogram"].items()
+                if count
+            )
+            print(f"\t\t{histogram}", file=sys.stderr)
+        print("Stages:", file=sys.stderr)
+        for name, milliseconds in data["stages"].items():
+            print(f"\t{name}: {milliseconds} ms", file=sys.stderr)
@@ -1,41 +1,43 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List
 
+from .aggregate import HoursMatrix
 from .classes import WorklogReport
+from .dateutils import format_day, is_single_month
 from .text_decoration import color_text
-from robojira_cli.helpers.constants import DATE_FORMAT
 
 
 def analyze_reports(
     reports: Dict[str, List[WorklogReport]],
-    not_working_days: List[int],
+    not_working_days: List[str],
     start_date: datetime,
     end_date: datetime,
     user: str,
     print_output: bool = True,
 ) -> Dict[str, List[str]]:
-    delta = timedelta(days=1)
+    matrix = HoursMatrix(start_date, end_date)
+    user_index = matrix.add_user(user, reports, not_working_days)
+    return analyze_hours(matrix, user_index, print_output)
+
+
+def analyze_hours(
+    matrix: HoursMatrix, user_index: int, print_output: bool = True
+) -> Dict[str, List[str]]:
+    user = matrix.users[user_index]
+    short = is_single_month(matrix.start_date, matrix.end_date)
     missing_dates, extra_time, not_enough_time, ok_days = [], [], [], []
-    while start_date <= end_date:
-        date = start_date.strftime(DATE_FORMAT)
-        day = start_date.day
-        if date not in reports:
-            if day not in not_working_days:
-                missing_dates.append(str(day))
+    holidays = matrix.holiday_mask(user_index)
+    for index, spent_hours in enumerate(matrix.hours(user_index)):
+        day = format_day(matrix.dates[index], short)
+        if not spent_hours:
+            if not holidays[index]:
+                missing_dates.append(day)
+        elif spent_hours > 8:
+            extra_time.append(f"{day}. {spent_hours}h")
+        elif spent_hours < 8:
+            not_enough_time.append(f"{day}. {spent_hours}h")
         else:
-            report = reports[date]
-            spent_time = round(
-                sum(worklog.time_in_seconds for worklog in report), 2
-            )
-
-            spent_hours = round(spent_time / 60 / 60, 2)
-            if spent_hours > 8:
-                extra_time.append(f"{day}. {spent_hours}h")
-            elif spent_hours < 8:
-                not_enough_time.append(f"{day}. {spent_hours}h")
-            else:
-                ok_days.append(str(day))
-        start_date += delta
+            ok_days.append(day)
 
     if print_output:
         print(f"👀Report for {user}👀")
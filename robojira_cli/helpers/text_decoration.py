@@ -1,3 +1,5 @@
+import sys
+
 colors = {
     "bold": "\033[1m",
     "red": "\033[91m",
@@ -7,3 +9,21 @@ colors = {
 
 def color_text(text: str, color: str) -> str:
     return f"{colors[color]}{text}\033[0m"
+
+
+def print_progress(text: str):
+    if sys.stderr.isatty():
+        sys.stderr.write(f"\r\033[K{text}")
+        sys.stderr.flush()
+
+
+def clear_progress():
+    print_progress("")
+
+
+def print_in_place(text: str, previous_lines: int = 0) -> int:
+    # Terminals get the previous block redrawn, pipes get it appended
+    if previous_lines and sys.stdout.isatty():
+        sys.stdout.write(f"\033[{previous_lines}F\033[J")
+    print(text, flush=True)
+    return text.count("\n") + 1
@@ -0,0 +1,26 @@
+import sys
+import time
+from typing import Dict
+
+# Taken when the CLI starts importing, before any heavy module is loaded
+STARTED = time.perf_counter()
+
+
+class StartupTimer:
+    def __init__(self, started: float = STARTED):
+        self.started = started
+        self.last = started
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, name: str):
+        # Time since the previous mark is added to the named phase
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + now - self.last
+        self.last = now
+
+    def report(self):
+        print("Timing:", file=sys.stderr)
+        for name, seconds in self.phases.items():
+            print(f"\t{name}: {seconds * 1000:.1f} ms", file=sys.stderr)
+        total = (time.perf_counter() - self.started) * 1000
+        print(f"\ttotal: {total:.1f} ms", file=sys.stderr)
@@ -0,0 +1,202 @@
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+from requests import Response, Session
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+from .cassette import Cassette
+from .profiler import Profiler
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        if rate <= 0:
+            raise ValueError(f"Rate limit should be positive, got {rate}")
+        self.rate = rate
+        # Below one token acquire() could never take a whole request
+        self.capacity = max(1.0, capacity or rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.updated) * self.rate,
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter:
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.condition = threading.Condition()
+
+    def __enter__(self):
+        with self.condition:
+            while self.in_flight >= int(self.limit):
+                self.condition.wait()
+            self.in_flight += 1
+
+    def __exit__(self, *args):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def on_success(self):
+        with self.condition:
+            # Additive increase: roughly +1 per window of successful calls
+            self.limit = min(
+                self.max_concurrency, self.limit + 1 / max(self.limit, 1)
+            )
+            self.condition.notify_all()
+
+    def on_throttle(self):
+        with self.condition:
+            self.limit = max(1.0, self.limit / 2)
+
+
+def get_retry_after(response: Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ThrottledSession(Session):
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        max_concurrency: int = 8,
+        max_retries: int = 5,
+        backoff: float = 0.5,
+        max_backoff: float = 60.0,
+    ):
+        super().__init__()
+        # One keep-alive pool big enough for every concurrent caller
+        adapter = HTTPAdapter(pool_maxsize=max_concurrency)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.rate = rate
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+        # Set to collect per-endpoint latency, size and retry counts
+        self.profiler: Optional[Profiler] = None
+        # Set to record responses to disk or serve them back offline
+        self.cassette: Optional[Cassette] = None
+
+    def get_backoff(self, attempt: int) -> float:
+        # Full jitter keeps parallel retries from hitting the server together
+        return random.uniform(
+            0, min(self.max_backoff, self.backoff * 2**attempt)
+        )
+
+    def get_host_controls(self, url: str):
+        host = urlparse(url).netloc
+        with self._lock:
+            if host not in self._limiters:
+                self._limiters[host] = AdaptiveLimiter(self.max_concurrency)
+                if self.rate:
+                    self._buckets[host] = TokenBucket(self.rate)
+            return self._buckets.get(host), self._limiters[host]
+
+    def record(
+        self,
+        method: str,
+        url: str,
+        started: float,
+        response: Optional[Response],
+        attempt: int,
+    ):
+        if not self.profiler:
+            return
+        self.profiler.record_request(
+            method,
+            url,
+            time.perf_counter() - started,
+            response.status_code if response is not None else None,
+            len(response.content) if response is not None else 0,
+            attempt > 0,
+        )
+
+    def request(self, method, url, *args, **kwargs) -> Response:
+        if self.cassette and self.cassette.replay:
+            started = time.perf_counter()
+            response = self.cassette.load(method, url, **kwargs)
+            if response is None:
+                raise ValueError(
+                    f"No recorded response for {method} {url} "
+                    f"in {self.cassette.folder}"
+                )
+            self.record(method, url, started, response, 0)
+            return response
+
+        bucket, limiter = self.get_host_controls(url)
+        attempt = 0
+        while True:
+            if bucket:
+                bucket.acquire()
+            started = time.perf_counter()
+            try:
+                with limiter:
+                    response = super().request(method, url, *args, **kwargs)
+            except (ConnectionError, Timeout):
+                self.record(method, url, started, None, attempt)
+                if attempt >= self.max_retries:
+                    raise
+                limiter.on_throttle()
+                time.sleep(self.get_backoff(attempt))
+                attempt += 1
+                continue
+
+            self.record(method, url, started, response, attempt)
+            if (
+                response.status_code in RETRY_STATUSES
+                and attempt < self.max_retries
+            ):
+                limiter.on_throttle()
+                delay = get_retry_after(response)
+                if delay is None:
+                    delay = self.get_backoff(attempt)
+                elif delay > self.max_backoff:
+                    # Waiting longer than max_backoff would stall the whole
+                    # report, so the throttled response is the final one
+                    return response
+                response.close()
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            limiter.on_success()
+            if self.cassette:
+                self.cassette.save(method, url, response, **kwargs)
+            return response
@@ -1,37 +1,138 @@
-from typing import List
+import json
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Set
 
-from requests import Session
+from .constants import DATE_FORMAT, DEFAULT_WORKING_DAYS_RATE_LIMIT
+from .dateutils import get_current_year
+from .file_cache import FileCache
+from .transport import ThrottledSession
 
-from .dateutils import get_current_year, last_day_of_month
+HOLIDAYS_TTL = 7 * 24 * 60 * 60
+
+
+def get_weekends(year: int) -> Set[str]:
+    day = date(year, 1, 1)
+    weekends = set()
+    while day.year == year:
+        if day.weekday() >= 5:
+            weekends.add(day.isoformat())
+        day += timedelta(days=1)
+    return weekends
+
+
+def parse_ics_date(line: str) -> date:
+    value = line.split(":", 1)[1].strip()
+    return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+
+
+def load_calendar_file(path: Path) -> Set[str]:
+    text = path.read_text()
+    if path.suffix.lower() != ".ics":
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("non_working_days", [])
+        return {
+            item["date"] if isinstance(item, dict) else item for item in data
+        }
+
+    days = set()
+    start = end = None
+    for line in text.splitlines():
+        if line.startswith("BEGIN:VEVENT"):
+            start = end = None
+        elif line.startswith("DTSTART"):
+            start = parse_ics_date(line)
+        elif line.startswith("DTEND"):
+            end = parse_ics_date(line)
+        elif line.startswith("END:VEVENT") and start:
+            # DTEND of an all-day event is exclusive
+            end = end or start + timedelta(days=1)
+            while start < end:
+                days.add(start.isoformat())
+                start += timedelta(days=1)
+    return days
 
 
 class WorkingDaysApi:
-    def __init__(self, token: str):
-        self.base_url = "https://working-days.p.rapidapi.com/1.3"
-        self.session = Session()
+    def __init__(
+        self,
+        token: str,
+        cache: Optional[FileCache] = None,
+        calendars: Optional[Dict[str, str]] = None,
+        base_url: Optional[str] = None,
+    ):
+        self.base_url = base_url or "https://working-days.p.rapidapi.com/1.3"
+        self.session = ThrottledSession(DEFAULT_WORKING_DAYS_RATE_LIMIT, 2)
         self.session.headers.update(
             {
                 "X-RapidAPI-Key": token,
                 "X-RapidAPI-Host": "working-days.p.rapidapi.com",
             }
         )
+        self.cache = cache
+        self.calendars = calendars or {}
+        self.calendar_days: Dict[str, Set[str]] = {}
 
-    def get_not_working_days(
-        self, month: int, country_code: str, year: int = None
-    ) -> List[int]:
+    def fetch_year_not_working_days(
+        self, country_code: str, year: int
+    ) -> List[str]:
         url = f"{self.base_url}/list_non_working_days"
-        if not year:
-            year = get_current_year()
-        last_day = last_day_of_month(month, year).day
-        month = f"{month:02d}"
         query = {
             "country_code": country_code,
-            "start_date": f"{year}-{month}-01",
-            "end_date": f"{year}-{month}-{last_day}",
+            "start_date": f"{year}-01-01",
+            "end_date": f"{year}-12-31",
         }
 
         response = self.session.get(url, params=query)
         if not response.ok:
             raise ValueError(response.content)
         not_working = response.json()["non_working_days"]
-        return [int(data["date"].split("-")[-1]) for data in not_working]
+        return sorted(data["date"] for data in not_working)
+
+    def get_year_not_working_days(
+        self, country_code: str, year: int
+    ) -> List[str]:
+        if country_code in self.calendars:
+            if country_code not in self.calendar_days:
+                self.calendar_days[country_code] = load_calendar_file(
+                    Path(self.calendars[country_code])
+                )
+            days = self.calendar_days[country_code] | get_weekends(year)
+            return sorted(day for day in days if day.startswith(str(year)))
+
+        if not self.cache:
+            return self.fetch_year_not_working_days(country_code, year)
+
+        key = f"holidays_{country_code}_{year}"
+        # Past years never change, current and future ones may be amended
+        ttl = None if year < get_current_year() else HOLIDAYS_TTL
+        days = self.cache.get(key, ttl)
+        if days is None:
+            days = self.fetch_year_not_working_days(country_code, year)
+            self.cache.set(key, days)
+        return days
+
+    def get_not_working_days(
+        self, month: int, country_code: str, year: int = None
+    ) -> List[int]:
+        if not year:
+            year = get_current_year()
+        prefix = f"{year}-{month:02d}-"
+        return [
+            int(day.split("-")[-1])
+            for day in self.get_year_not_working_days(country_code, year)
+            if day.startswith(prefix)
+        ]
+
+    def get_not_working_dates(
+        self, start_date: datetime, end_date: datetime, country_code: str
+    ) -> List[str]:
+        start = start_date.strftime(DATE_FORMAT)
+        end = end_date.strftime(DATE_FORMAT)
+        return [
+            day
+            for year in range(start_date.year, end_date.year + 1)
+            for day in self.get_year_not_working_days(country_code, year)
+            if start <= day <= end
+        ]
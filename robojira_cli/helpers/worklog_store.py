@@ -0,0 +1,186 @@
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from .classes import StringTable, UserWorklogs
+from .constants import DATE_FORMAT, WEBHOOK_FRESHNESS
+from .dateutils import get_worklog_date
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS issues (
+    id TEXT PRIMARY KEY,
+    key TEXT NOT NULL,
+    summary TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS worklogs (
+    id TEXT PRIMARY KEY,
+    issue_id TEXT NOT NULL,
+    author_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    seconds INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS worklogs_author_day ON worklogs (author_id, day);
+CREATE TABLE IF NOT EXISTS covered_days (
+    author_id TEXT NOT NULL,
+    day TEXT NOT NULL,
+    PRIMARY KEY (author_id, day)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class WorklogStore:
+    def __init__(self, path: Optional[Path] = None):
+        # Without a path the store only lives as long as the process
+        if path:
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self.connection = sqlite3.connect(
+            str(path) if path else ":memory:", check_same_thread=False
+        )
+        self.lock = threading.Lock()
+        with self.lock, self.connection:
+            self.connection.executescript(SCHEMA)
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)
+        ).fetchone()
+        if row:
+            return row[0]
+
+    def set_meta(self, key: str, value: str):
+        with self.lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                (key, value),
+            )
+
+    def is_webhook_live(self) -> bool:
+        # Only events that actually arrived prove the store is current; a
+        # `serve` nobody can reach must not stop reports from polling
+        applied = self.get_meta("webhook_applied")
+        return bool(applied) and (
+            time.time() - float(applied) < WEBHOOK_FRESHNESS
+        )
+
+    def get_tracked_authors(self) -> Set[str]:
+        rows = self.connection.execute(
+            "SELECT DISTINCT author_id FROM covered_days"
+        )
+        return {row[0] for row in rows}
+
+    def get_missing_days(
+        self, author_id: str, start_date: datetime, end_date: datetime
+    ) -> List[datetime]:
+        covered = {
+            row[0]
+            for row in self.connection.execute(
+                "SELECT day FROM covered_days "
+                "WHERE author_id = ? AND day BETWEEN ? AND ?",
+                (
+                    author_id,
+                    start_date.strftime(DATE_FORMAT),
+                    end_date.strftime(DATE_FORMAT),
+                ),
+            )
+        }
+        missing = []
+        while start_date <= end_date:
+            if start_date.strftime(DATE_FORMAT) not in covered:
+                missing.append(start_date)
+            start_date += timedelta(days=1)
+        return missing
+
+    def mark_covered(
+        self,
+        author_ids: Iterable[str],
+        start_date: datetime,
+        end_date: datetime,
+    ):
+        days = []
+        while start_date <= end_date:
+            days.append(start_date.strftime(DATE_FORMAT))
+            start_date += timedelta(days=1)
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO covered_days (author_id, day) "
+                "VALUES (?, ?)",
+                [(author_id, day) for author_id in author_ids for day in days],
+            )
+
+    def get_missing_issue_ids(self, issue_ids: Iterable[str]) -> List[str]:
+        rows = self.connection.execute("SELECT id FROM issues")
+        return sorted(set(issue_ids) - {row[0] for row in rows})
+
+    def save_issues(self, issues: Iterable[dict]):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO issues (id, key, summary) "
+                "VALUES (?, ?, ?)",
+                [
+                    (issue["id"], issue["key"], issue["fields"]["summary"])
+                    for issue in issues
+                ],
+            )
+
+    def save_worklogs(self, worklogs: Iterable[dict]):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO worklogs "
+                "(id, issue_id, author_id, day, seconds) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        str(worklog["id"]),
+                        str(worklog["issueId"]),
+                        worklog["updateAuthor"]["accountId"],
+                        get_worklog_date(worklog["started"]),
+                        worklog["timeSpentSeconds"],
+                    )
+                    for worklog in worklogs
+                ],
+            )
+
+    def delete_worklogs(self, worklog_ids: Iterable[str]):
+        with self.lock, self.connection:
+            self.connection.executemany(
+                "DELETE FROM worklogs WHERE id = ?",
+                [(str(worklog_id),) for worklog_id in worklog_ids],
+            )
+
+    def get_team_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+    ) -> Dict[str, UserWorklogs]:
+        dates, titles = StringTable(), StringTable()
+        reports = {
+            user_id: UserWorklogs(dates, titles) for user_id in user_ids
+        }
+        if not user_ids:
+            return reports
+        placeholders = ", ".join("?" for _ in user_ids)
+        rows = self.connection.execute(
+            "SELECT w.author_id, w.day, i.key, i.summary, SUM(w.seconds) "
+            "FROM worklogs w JOIN issues i ON i.id = w.issue_id "
+            f"WHERE w.author_id IN ({placeholders}) "
+            "AND w.day BETWEEN ? AND ? "
+            "GROUP BY w.author_id, w.day, w.issue_id "
+            "ORDER BY w.day, i.key",
+            (
+                *user_ids,
+                start_date.strftime(DATE_FORMAT),
+                end_date.strftime(DATE_FORMAT),
+            ),
+        )
+        for author_id, day, key, summary, seconds in rows:
+            reports[author_id].add(day, f"{key}: {summary}", seconds)
+        return reports
@@ -1,106 +1,240 @@
-from datetime import datetime, timedelta
-from functools import partial
-from multiprocessing import Pool
-from typing import Optional, Dict, List
+import asyncio
+import time
+from datetime import datetime
+from typing import Optional, Dict, List, Iterator, Mapping, Tuple
 
-from requests import Session
-
-from robojira_cli.helpers.constants import DATE_FORMAT
+from robojira_cli.helpers.constants import (
+    DATE_FORMAT,
+    DEFAULT_CONCURRENCY,
+    DEFAULT_JIRA_RATE_LIMIT,
+    WATCH_INTERVAL,
+    WATCH_MAX_INTERVAL,
+)
 
 try:
-    from robojira_cli.helpers.classes import WorklogReport
+    from robojira_cli.async_jira_client import AsyncJiraApi, iterate_sync
+    from robojira_cli.helpers.classes import UserWorklogs, WorklogReport
     from robojira_cli.helpers.dateutils import (
         last_day_of_month,
         get_current_year,
     )
-    from robojira_cli.helpers.text_decoration import color_text
+    from robojira_cli.helpers.file_cache import FileCache
+    from robojira_cli.helpers.text_decoration import (
+        clear_progress,
+        color_text,
+        print_progress,
+    )
+    from robojira_cli.helpers.worklog_store import WorklogStore
 except ImportError:
-    from helpers.classes import WorklogReport
+    from async_jira_client import AsyncJiraApi, iterate_sync
+    from helpers.classes import UserWorklogs, WorklogReport
     from helpers.dateutils import last_day_of_month, get_current_year
-    from helpers.text_decoration import color_text
+    from helpers.file_cache import FileCache
+    from helpers.text_decoration import (
+        clear_progress,
+        color_text,
+        print_progress,
+    )
+    from helpers.worklog_store import WorklogStore
+
+
+def print_day_report(
+    date: str, reports: List[WorklogReport], short_report: bool = False
+):
+    print(color_text(f"{date}:", "bold"))
+    for report in reports:
+        if short_report:
+            print(f"\t{report.title}")
+        else:
+            print(f"\t{report.summary}")
+    print("")
+
+
+def print_period_report(
+    days: Iterator[Tuple[str, List[WorklogReport]]],
+    total: int,
+    short_report: bool = False,
+) -> Dict[str, List[WorklogReport]]:
+    issues: Dict[str, List[WorklogReport]] = {}
+    print("📄 User work 📄")
+    for index, (date, reports) in enumerate(days, 1):
+        clear_progress()
+        if reports:
+            issues[date] = reports
+            print_day_report(date, reports, short_report)
+        print_progress(f"Fetched {index}/{total} days")
+    clear_progress()
+    return issues
 
 
 class JiraApi:
-    def __init__(self, domain: str, login: str, token: str):
-        self.base_url = f"https://{domain}.atlassian.net/rest/api/3"
-        self.session = Session()
-        self.session.auth = (login, token)
-        self.session.headers.update({"Content-Type": "application/json"})
-        self.myself = self.get_myself()
-        self.user_id = self.myself["accountId"]
+    def __init__(
+        self,
+        domain: str,
+        login: str,
+        token: str,
+        concurrency: int = DEFAULT_CONCURRENCY,
+        store: Optional[WorklogStore] = None,
+        cache: Optional[FileCache] = None,
+        rate_limit: Optional[float] = DEFAULT_JIRA_RATE_LIMIT,
+        base_url: Optional[str] = None,
+    ):
+        self.async_api = AsyncJiraApi(
+            domain,
+            login,
+            token,
+            concurrency,
+            store,
+            cache,
+            rate_limit,
+            base_url,
+        )
+        self.base_url = self.async_api.base_url
+        self.session = self.async_api.session
+        self.concurrency = concurrency
+
+    @property
+    def sites(self) -> List["JiraApi"]:
+        return [self]
+
+    @property
+    def user_id(self) -> str:
+        return asyncio.run(self.async_api.get_user_id())
+
+    def ensure_store(self) -> WorklogStore:
+        if not self.async_api.store:
+            self.async_api.store = WorklogStore()
+        return self.async_api.store
+
+    @property
+    def myself(self) -> dict:
+        return self.get_myself()
 
     def get_myself(self) -> dict:
-        return self.session.get(f"{self.base_url}/myself").json()
+        return asyncio.run(self.async_api.get_myself())
+
+    def search_issues(self, query: str, fields: str) -> Iterator[dict]:
+        pages = self.async_api.search_issues(query, fields)
+        for issues in iterate_sync(pages):
+            yield from issues
 
     def get_user_by_username(self, username: str) -> Optional[dict]:
-        url = f"{self.base_url}/user/search"
-        params = {"query": username}
-        response = self.session.get(url, params=params)
-        if not response.ok:
-            raise ValueError(response.content)
-        data = response.json()
-        if data:
-            return data[0]
+        return asyncio.run(self.async_api.get_user_by_username(username))
+
+    def get_account_ids(self, usernames: List[str]) -> Dict[str, str]:
+        return asyncio.run(self.async_api.get_account_ids(usernames))
+
+    def sync_store(self):
+        asyncio.run(self.async_api.sync_store())
+
+    def get_issues_by_ids(self, issue_ids: List[str]) -> List[dict]:
+        return asyncio.run(self.async_api.get_issues_by_ids(issue_ids))
 
     def get_report(
         self,
         date: datetime,
         user_id: Optional[str] = None,
     ) -> Dict[str, List[WorklogReport]]:
+        issue_date = date.strftime(DATE_FORMAT)
+        report = self.get_period_report(date, date, user_id)
+        return {issue_date: report.get(issue_date, [])}
+
+    def watch_report(
+        self,
+        date: datetime,
+        interval: float = WATCH_INTERVAL,
+        max_interval: float = WATCH_MAX_INTERVAL,
+        user_id: Optional[str] = None,
+    ) -> Iterator[Dict[str, List[WorklogReport]]]:
+        # Ticks only apply /worklog/updated and /worklog/deleted changes,
+        # which needs a store to apply them to
+        self.ensure_store()
+
+        previous = None
+        delay = interval
+        while True:
+            report = self.get_report(date, user_id)
+            current = [
+                (worklog.title, worklog.time_in_seconds)
+                for worklogs in report.values()
+                for worklog in worklogs
+            ]
+            if current != previous:
+                previous = current
+                delay = interval
+                yield report
+            else:
+                # Back off while nothing changes
+                delay = min(delay * 2, max_interval)
+            print_progress(
+                f"Checked at {datetime.now().strftime('%H:%M:%S')}, "
+                f"next check in {round(delay)}s"
+            )
+            time.sleep(delay)
+
+    def get_issue_worklogs(
+        self, issue: dict, start_date: datetime, end_date: datetime
+    ) -> List[dict]:
+        return asyncio.run(
+            self.async_api.get_issue_worklogs(issue, start_date, end_date)
+        )
+
+    def get_team_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+    ) -> Dict[str, UserWorklogs]:
+        return asyncio.run(
+            self.async_api.get_team_report(start_date, end_date, user_ids)
+        )
+
+    def start_report(self):
+        asyncio.run(self.async_api.start_report())
+
+    def fetch_team_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+    ) -> Dict[str, UserWorklogs]:
+        # Skips the store refresh, so start_report() has to run first
+        return asyncio.run(
+            self.async_api.fetch_team_report(start_date, end_date, user_ids)
+        )
+
+    def iter_period_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[str] = None,
+    ) -> Iterator[Tuple[str, List[WorklogReport]]]:
         if not user_id:
             user_id = self.user_id
-        issue_date = date.strftime(DATE_FORMAT)
-        query = f"worklogDate = {issue_date} AND worklogAuthor = {user_id}"
-        params = {"jql": query, "maxResults": 100, "fields": "summary,worklog"}
-        url = self.base_url + "/search/jql"
-        response = self.session.get(url, params=params)
-        if not response.ok:
-            raise ValueError(response.content)
-        issues = []
-        for issue in response.json()["issues"]:
-            total_time = 0
-
-            fields = issue["fields"]
-
-            if "worklog" in fields:
-                for worklog in fields["worklog"]["worklogs"]:
-                    if worklog["updateAuthor"]["accountId"] != user_id:
-                        continue
-                    started = worklog["started"]
-                    try:
-                        worklog_date = datetime.fromisoformat(started)
-                    except ValueError:
-                        started = started.split("T")[0]
-                        worklog_date = datetime.strptime(started, "%Y-%m-%d")
-                    if worklog_date.strftime(DATE_FORMAT) == issue_date:
-                        total_time += worklog["timeSpentSeconds"]
-            if total_time == 0:
-                total_time = self.get_worklog_time(issue["key"], date, user_id)
-            title = f'{issue["key"]}: {fields["summary"]}'
-
-            issues.append(WorklogReport(title, total_time))
-
-        return {issue_date: issues}
-
-    def get_worklog_time(
-        self, issue_key: str, date: datetime, user_id: str
-    ) -> int:
-        url = f"{self.base_url}/issue/{issue_key}/worklog"
-        start = date.replace(hour=0, minute=0, second=0)
-        end = date.replace(hour=23, minute=59, second=59)
-        params = {
-            "startedAfter": int(start.timestamp() * 1000),
-            "startedBefore": int(end.timestamp() * 1000),
-        }
-
-        response = self.session.get(url, params=params).json()
-        total_time = 0
-        for worklog in response["worklogs"]:
-            if worklog["updateAuthor"]["accountId"] != user_id:
-                continue
-            total_time += worklog["timeSpentSeconds"]
-
-        return total_time
+        return iterate_sync(
+            self.async_api.iter_period_report(start_date, end_date, user_id)
+        )
+
+    def get_period_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[str] = None,
+        print_report: bool = False,
+        short_report: bool = False,
+    ) -> Mapping[str, List[WorklogReport]]:
+        if not user_id:
+            user_id = self.user_id
+        if not print_report:
+            return asyncio.run(
+                self.async_api.get_period_report(start_date, end_date, user_id)
+            )
+
+        return print_period_report(
+            self.iter_period_report(start_date, end_date, user_id),
+            (end_date - start_date).days + 1,
+            short_report,
+        )
 
     def get_month_report(
         self,
@@ -109,12 +243,12 @@ class JiraApi:
         user: Optional[str] = None,
         print_report: bool = False,
         short_report: bool = False,
-    ) -> Dict[str, List[WorklogReport]]:
+    ) -> Mapping[str, List[WorklogReport]]:
         if user:
-            user_data = self.get_user_by_username(user)
-            if not user_data:
-                print(f"Can't find user with username {user}")
-            user_id = user_data["accountId"]
+            account_ids = self.get_account_ids([user])
+            if user not in account_ids:
+                return {}
+            user_id = account_ids[user]
         else:
             user_id = self.user_id
 
@@ -124,32 +258,6 @@ class JiraApi:
         start_date = datetime(year, month_number, 1)
         end_date = last_day_of_month(month_number, year)
 
-        delta = timedelta(days=1)
-
-        issues: Dict[str, List[WorklogReport]] = {}
-        dates = []
-        func = partial(self.get_report, user_id=user_id)
-
-        while start_date <= end_date:
-            dates.append(start_date)
-            start_date += delta
-
-        with Pool() as pool:
-            reports = pool.map(func, dates)
-
-        for report in reports:
-            for key, value in report.items():
-                if value:
-                    issues[key] = value
-
-        if print_report:
-            print("📄 User work 📄")
-            for key, value in issues.items():
-                print(color_text(f"{key}:", "bold"))
-                for report in value:
-                    if short_report:
-                        print(f"\t{report.title}")
-                    else:
-                        print(f"\t{report.summary}")
-                print("")
-        return issues
+        return self.get_period_report(
+            start_date, end_date, user_id, print_report, short_report
+        )
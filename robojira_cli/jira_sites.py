@@ -0,0 +1,249 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from queue import Queue
+from typing import (
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    TypeVar,
+)
+
+from robojira_cli.helpers.constants import DATE_FORMAT
+
+try:
+    from robojira_cli.helpers.classes import (
+        StringTable,
+        UserWorklogs,
+        WorklogReport,
+    )
+    from robojira_cli.jira_client import JiraApi, print_period_report
+except ImportError:
+    from helpers.classes import StringTable, UserWorklogs, WorklogReport
+    from jira_client import JiraApi, print_period_report
+
+T = TypeVar("T")
+
+
+def merge_worklogs(
+    reports: List[Mapping[str, List[WorklogReport]]],
+    dates: StringTable,
+    titles: StringTable,
+) -> UserWorklogs:
+    merged = UserWorklogs(dates, titles)
+    for report in reports:
+        if isinstance(report, UserWorklogs):
+            totals = report.totals()
+        else:
+            totals = (
+                (date, worklog.title, worklog.time_in_seconds)
+                for date, worklogs in report.items()
+                for worklog in worklogs
+            )
+        for date, title, seconds in totals:
+            merged.add(date, title, seconds)
+    return merged
+
+
+def iter_results(results: Queue) -> Iterator[T]:
+    while True:
+        ok, value = results.get()
+        if ok:
+            yield value
+        elif value is None:
+            return
+        else:
+            raise value
+
+
+def iterate_in_thread(items: Iterator[T]) -> Iterator[T]:
+    # Drives a site's iterator on its own thread, started right away, so
+    # several sites fetch at once while their items are consumed in order
+    results: Queue = Queue()
+
+    def produce():
+        try:
+            for item in items:
+                results.put((True, item))
+        except BaseException as error:
+            results.put((False, error))
+        else:
+            results.put((False, None))
+
+    threading.Thread(target=produce, name="robojira-site", daemon=True).start()
+    return iter_results(results)
+
+
+class JiraSites:
+    # Several Jira sites behind the JiraApi report methods. Account ids are
+    # per site, so people are identified by username and their worklogs
+    # from every site are merged into one report
+    def __init__(self, sites: List[JiraApi]):
+        self.sites = sites
+        self.concurrency = sum(site.concurrency for site in sites)
+        self.account_ids: List[Dict[str, str]] = [{} for _ in sites]
+
+    def map_sites(self, func: Callable[..., T], *iterables) -> List[T]:
+        # Every site has its own session, limits and event loop, so each
+        # one runs on its own thread
+        with ThreadPoolExecutor(
+            max_workers=len(self.sites), thread_name_prefix="robojira-site"
+        ) as executor:
+            return list(executor.map(func, self.sites, *iterables))
+
+    def ensure_store(self):
+        for site in self.sites:
+            site.ensure_store()
+
+    def sync_store(self):
+        self.map_sites(lambda site: site.sync_store())
+
+    def get_account_ids(self, usernames: List[str]) -> Dict[str, str]:
+        site_ids = self.map_sites(lambda site: site.get_account_ids(usernames))
+        for account_ids, found in zip(self.account_ids, site_ids):
+            account_ids.update(found)
+        return {
+            username: username
+            for username in usernames
+            if any(username in found for found in site_ids)
+        }
+
+    def get_site_ids(self, usernames: List[str]) -> List[Dict[str, str]]:
+        missing = [
+            username
+            for username in usernames
+            if not any(username in ids for ids in self.account_ids)
+        ]
+        if missing:
+            self.get_account_ids(missing)
+        return [
+            {
+                username: account_ids[username]
+                for username in usernames
+                if username in account_ids
+            }
+            for account_ids in self.account_ids
+        ]
+
+    def start_report(self):
+        self.map_sites(lambda site: site.start_report())
+
+    def get_team_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+    ) -> Dict[str, UserWorklogs]:
+        self.start_report()
+        return self.fetch_team_report(start_date, end_date, user_ids)
+
+    def fetch_team_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_ids: List[str],
+    ) -> Dict[str, UserWorklogs]:
+        def fetch(
+            site: JiraApi, account_ids: Dict[str, str]
+        ) -> Dict[str, UserWorklogs]:
+            if not account_ids:
+                return {}
+            reports = site.fetch_team_report(
+                start_date, end_date, list(dict.fromkeys(account_ids.values()))
+            )
+            return {
+                username: reports[account_id]
+                for username, account_id in account_ids.items()
+            }
+
+        site_reports = self.map_sites(fetch, self.get_site_ids(user_ids))
+        dates, titles = StringTable(), StringTable()
+        return {
+            username: merge_worklogs(
+                [
+                    reports[username]
+                    for reports in site_reports
+                    if username in reports
+                ],
+                dates,
+                titles,
+            )
+            for username in user_ids
+        }
+
+    def iter_period_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[str] = None,
+    ) -> Iterator[Tuple[str, List[WorklogReport]]]:
+        if user_id:
+            streams = [
+                site.iter_period_report(start_date, end_date, ids[user_id])
+                for site, ids in zip(self.sites, self.get_site_ids([user_id]))
+                if user_id in ids
+            ]
+        else:
+            # Without a user every site reports its own login
+            streams = [
+                site.iter_period_report(start_date, end_date)
+                for site in self.sites
+            ]
+        if not streams:
+            while start_date <= end_date:
+                yield start_date.strftime(DATE_FORMAT), []
+                start_date += timedelta(days=1)
+            return
+
+        # Every site yields the same days in date order, so they are merged
+        # day by day as the slowest site gets there
+        dates, titles = StringTable(), StringTable()
+        days = zip(*[iterate_in_thread(stream) for stream in streams])
+        for site_days in days:
+            date = site_days[0][0]
+            merged = merge_worklogs(
+                [{date: reports} for _, reports in site_days], dates, titles
+            )
+            yield date, dict(merged.items()).get(date, [])
+
+    def get_period_report(
+        self,
+        start_date: datetime,
+        end_date: datetime,
+        user_id: Optional[str] = None,
+        print_report: bool = False,
+        short_report: bool = False,
+    ) -> Mapping[str, List[WorklogReport]]:
+        if print_report:
+            return print_period_report(
+                self.iter_period_report(start_date, end_date, user_id),
+                (end_date - start_date).days + 1,
+                short_report,
+            )
+        if user_id:
+            report = self.get_team_report(start_date, end_date, [user_id])
+            return report[user_id]
+        # Without a user every site reports its own login
+        return merge_worklogs(
+            self.map_sites(
+                lambda site: site.get_period_report(start_date, end_date)
+            ),
+            StringTable(),
+            StringTable(),
+        )
+
+    def get_report(
+        self,
+        date: datetime,
+        user_id: Optional[str] = None,
+    ) -> Dict[str, List[WorklogReport]]:
+        issue_date = date.strftime(DATE_FORMAT)
+        report = self.get_period_report(date, date, user_id)
+        return {issue_date: report.get(issue_date, [])}
+
+    # Polls get_report like a single site does
+    watch_report = JiraApi.watch_report
@@ -0,0 +1,156 @@
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List
+
+try:
+    from robojira_cli.async_jira_client import is_user_error
+    from robojira_cli.helpers.classes import UserReport, UserWorklogs
+    from robojira_cli.helpers.profiler import Profiler
+    from robojira_cli.helpers.working_days import WorkingDaysApi
+    from robojira_cli.jira_client import JiraApi
+except ImportError:
+    from async_jira_client import is_user_error
+    from helpers.classes import UserReport, UserWorklogs
+    from helpers.profiler import Profiler
+    from helpers.working_days import WorkingDaysApi
+    from jira_client import JiraApi
+
+
+@dataclass
+class ManagerReport:
+    # Countries and users keep the order they have in the config
+    not_working_days: Dict[str, List[str]] = field(default_factory=dict)
+    user_reports: List[UserReport] = field(default_factory=list)
+    failures: Dict[str, str] = field(default_factory=dict)
+
+
+def run_stage(profiler: Profiler, name: str, func: Callable, *args):
+    with profiler.span(name):
+        return func(*args)
+
+
+def fetch_worklogs(
+    executor: ThreadPoolExecutor,
+    profiler: Profiler,
+    jira_api: JiraApi,
+    start_date: datetime,
+    end_date: datetime,
+    user_ids: List[str],
+    failures: Dict[str, str],
+) -> Dict[str, UserWorklogs]:
+    # The store is refreshed once, for the team and any per-user fallback
+    run_stage(profiler, "fetch", jira_api.start_report)
+    try:
+        return run_stage(
+            profiler,
+            "fetch",
+            jira_api.fetch_team_report,
+            start_date,
+            end_date,
+            user_ids,
+        )
+    except Exception as error:
+        if not is_user_error(error):
+            raise
+        # Jira rejected the batch query, so fetch users one by one and let
+        # the bad ones fail on their own
+        print(f"Team fetch failed, fetching users one by one: {error}")
+
+    futures = {
+        user_id: executor.submit(
+            run_stage,
+            profiler,
+            "fetch",
+            jira_api.fetch_team_report,
+            start_date,
+            end_date,
+            [user_id],
+        )
+        for user_id in user_ids
+    }
+    reports = {}
+    for user_id, future in futures.items():
+        try:
+            reports[user_id] = future.result()[user_id]
+        except Exception as error:
+            failures[user_id] = str(error)
+    return reports
+
+
+def build_manager_report(
+    jira_api: JiraApi,
+    working_day_api: WorkingDaysApi,
+    users: Dict[str, List[str]],
+    start_date: datetime,
+    end_date: datetime,
+    profiler: Profiler,
+) -> ManagerReport:
+    report = ManagerReport()
+    usernames = list(
+        dict.fromkeys(
+            user for code_users in users.values() for user in code_users
+        )
+    )
+
+    # Holidays, account lookups and worklogs share one bounded pool, and
+    # holidays are fetched while Jira is busy with the team
+    with ThreadPoolExecutor(
+        max_workers=jira_api.concurrency,
+        thread_name_prefix="robojira-manager",
+    ) as executor:
+        holidays = {
+            code: executor.submit(
+                run_stage,
+                profiler,
+                "holidays",
+                working_day_api.get_not_working_dates,
+                start_date,
+                end_date,
+                code,
+            )
+            for code in users
+        }
+        account_ids = run_stage(
+            profiler, "accounts", jira_api.get_account_ids, usernames
+        )
+        fetch_failures: Dict[str, str] = {}
+        worklogs = fetch_worklogs(
+            executor,
+            profiler,
+            jira_api,
+            start_date,
+            end_date,
+            list(dict.fromkeys(account_ids.values())),
+            fetch_failures,
+        )
+
+        for code, code_users in users.items():
+            try:
+                not_working_days = holidays[code].result()
+            except Exception as error:
+                for user in code_users:
+                    report.failures[user] = f"holidays for {code}: {error}"
+                continue
+            report.not_working_days[code] = not_working_days
+
+            for user in code_users:
+                if user not in account_ids:
+                    report.failures[user] = "no Jira account found"
+                    continue
+                account_id = account_ids[user]
+                if account_id in fetch_failures:
+                    report.failures[user] = (
+                        f"worklogs: {fetch_failures[account_id]}"
+                    )
+                    continue
+                report.user_reports.append(
+                    UserReport(
+                        user,
+                        worklogs[account_id],
+                        not_working_days,
+                        start_date,
+                        end_date,
+                    )
+                )
+    return report
@@ -0,0 +1,177 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from robojira_cli.helpers.constants import (
+    DATE_FORMAT,
+    DEFAULT_WEBHOOK_PORT,
+)
+
+try:
+    from robojira_cli.helpers.dateutils import last_day_of_month
+    from robojira_cli.helpers.worklog_store import WorklogStore
+    from robojira_cli.jira_client import JiraApi
+except ImportError:
+    from helpers.dateutils import last_day_of_month
+    from helpers.worklog_store import WorklogStore
+    from jira_client import JiraApi
+
+WORKLOG_EVENTS = {"worklog_created", "worklog_updated", "worklog_deleted"}
+
+
+class WebhookIndex:
+    def __init__(self, jira_api: JiraApi, store: WorklogStore):
+        self.jira_api = jira_api
+        self.store = store
+        self.lock = threading.Lock()
+
+    def apply(self, event: dict) -> bool:
+        name = event.get("webhookEvent")
+        worklog = event.get("worklog")
+        if name not in WORKLOG_EVENTS or not worklog:
+            return False
+
+        # Same rules as the /worklog/updated sync: only tracked authors are
+        # indexed and a worklog taken over by someone else is dropped
+        author = worklog.get("updateAuthor", {}).get("accountId")
+        if (
+            name == "worklog_deleted"
+            or author not in self.store.get_tracked_authors()
+        ):
+            self.store.delete_worklogs([worklog["id"]])
+            self.mark_applied()
+            return name == "worklog_deleted"
+
+        with self.lock:
+            missing = self.store.get_missing_issue_ids(
+                [str(worklog["issueId"])]
+            )
+            if missing:
+                self.store.save_issues(self.jira_api.get_issues_by_ids(missing))
+        self.store.save_worklogs([worklog])
+        self.mark_applied()
+        return True
+
+    def mark_applied(self):
+        self.store.set_meta("webhook_applied", str(time.time()))
+
+    def get_reports(
+        self, usernames: list, start_date: datetime, end_date: datetime
+    ) -> Dict[str, Dict[str, list]]:
+        account_ids = self.jira_api.get_account_ids(usernames)
+        reports = self.jira_api.get_team_report(
+            start_date, end_date, list(dict.fromkeys(account_ids.values()))
+        )
+        return {
+            username: {
+                date: [
+                    {"title": report.title, "seconds": report.time_in_seconds}
+                    for report in day_reports
+                ]
+                for date, day_reports in reports[account_id].items()
+            }
+            for username, account_id in account_ids.items()
+        }
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    index: WebhookIndex
+    secret: str = ""
+    default_user: str = ""
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, payload, status: int = 200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def is_signed(self, body: bytes) -> bool:
+        if not self.secret:
+            return True
+        signature = self.headers.get("X-Hub-Signature", "")
+        expected = hmac.new(
+            self.secret.encode(), body, hashlib.sha256
+        ).hexdigest()
+        return hmac.compare_digest(signature, f"sha256={expected}")
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if not self.is_signed(body):
+            return self.send_json({"error": "bad signature"}, 401)
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return self.send_json({"error": "invalid json"}, 400)
+        try:
+            applied = self.index.apply(event)
+        except (KeyError, TypeError, ValueError) as error:
+            return self.send_json({"error": str(error)}, 400)
+        self.send_json({"applied": applied})
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: value[-1] for key, value in parse_qs(url.query).items()}
+        if url.path == "/health":
+            return self.send_json({"ok": True})
+        if url.path != "/report":
+            return self.send_json({"error": "not found"}, 404)
+
+        today = datetime.today()
+        try:
+            start_date = datetime.strptime(
+                query.get("from", today.strftime("%Y-%m-01")), DATE_FORMAT
+            )
+            end_date = datetime.strptime(
+                query.get(
+                    "to",
+                    last_day_of_month(start_date.month, start_date.year)
+                    .strftime(DATE_FORMAT),
+                ),
+                DATE_FORMAT,
+            )
+        except ValueError:
+            return self.send_json({"error": "dates should be YYYY-MM-DD"}, 400)
+        usernames = query.get("users", self.default_user).split(",")
+        self.send_json(self.index.get_reports(usernames, start_date, end_date))
+
+
+def serve(
+    config_data: dict,
+    jira_api: JiraApi,
+    host: str = "127.0.0.1",
+    port: Optional[int] = None,
+):
+    store = jira_api.ensure_store()
+    # Catch up on whatever changed while nothing was listening
+    jira_api.sync_store()
+
+    handler = type(
+        "Handler",
+        (WebhookHandler,),
+        {
+            "index": WebhookIndex(jira_api, store),
+            "secret": config_data.get("webhook_secret", ""),
+            "default_user": config_data["jira_username"],
+        },
+    )
+    port = port or config_data.get("webhook_port", DEFAULT_WEBHOOK_PORT)
+    server = ThreadingHTTPServer((host, port), handler)
+    print(f"Listening for Jira worklog webhooks on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        store.set_meta("webhook_applied", "0")